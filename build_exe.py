@@ -31,8 +31,15 @@ except ImportError:
 spec_content = """
 # -*- mode: python ; coding: utf-8 -*-
 
+import os
+import sys
+
 block_cipher = None
 
+# UPX makes the file smaller but slows every launch, raises resident memory
+# and trips antivirus scanners, so it is opt-in: COMPRESS=1 python build_exe.py
+compress = bool(os.environ.get('COMPRESS'))
+
 a = Analysis(
     ['web_app.py'],
     pathex=[],
@@ -42,16 +49,19 @@ a = Analysis(
         ('static', 'static'),
         ('converter_core.py', '.'),
     ],
+    # converter_core imports these inside functions; svgwrite is no longer
+    # used by the web app, so it is left out
     hiddenimports=[
-        'PIL._tkinter_finder',
         'cairosvg',
         'ezdxf',
-        'svgwrite',
     ],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=[
+        'tkinter', 'test', 'unittest', 'pydoc', 'lib2to3', 'distutils',
+        'setuptools', 'pip', 'matplotlib', 'scipy', 'sphinx', 'pytest',
+    ],
     win_no_prefer_redirects=False,
     win_private_assemblies=False,
     cipher=block_cipher,
@@ -70,8 +80,8 @@ exe = EXE(
     name='LaserConverter',
     debug=False,
     bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
+    strip=sys.platform.startswith('linux'),
+    upx=compress,
     upx_exclude=[],
     runtime_tmpdir=None,
     console=True,
@@ -104,6 +114,7 @@ try:
     print("  3. Open browser to http://localhost:5000")
     print("  4. Start converting files!")
     print("\n💡 Tip: You can also run it from command line with options")
+    print("💡 Tip: Set COMPRESS=1 to UPX-compress the executable (smaller file, slower startup)")
     print("="*70)
     
 except subprocess.CalledProcessError as e:
@@ -4,10 +4,95 @@ Core conversion functions for laser engraving file converter.
 This module contains all the conversion logic that can be used by both CLI and web interfaces.
 """
 
+import importlib
+import io
+import math
+import mmap
+import multiprocessing
 import os
+import shutil
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
+import numpy as np
 from PIL import Image
 
 
+VECTOR_EXTENSIONS = frozenset({'.svg', '.dxf', '.ai', '.eps'})
+RASTER_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.tif'})
+
+# Leading bytes -> canonical extension, for files without a usable extension
+_MAGIC_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'BM', '.bmp'),
+    (b'II*\x00', '.tif'),
+    (b'MM\x00*', '.tif'),
+    (b'%PDF', '.ai'),
+    (b'%!PS', '.eps'),
+    (b'<?xml', '.svg'),
+    (b'<svg', '.svg'),
+    (b'0\r\nSECTION', '.dxf'),
+    (b'0\nSECTION', '.dxf'),
+)
+
+
+@lru_cache(maxsize=256)
+def _sniff_extension(file_path, mtime):
+    """
+    Identify a file format from its leading bytes.
+    
+    Cached per (path, mtime) so repeated lookups of an unchanged file do
+    not reopen it.
+    
+    Returns:
+        Canonical extension (e.g. '.png'), or None if unrecognized
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            head = f.read(16).lstrip()
+    except OSError:
+        return None
+    
+    for signature, ext in _MAGIC_SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    return None
+
+
+def detect_file_format(file_path):
+    """
+    Detect the type and format of an input file.
+    
+    The extension is used when it is a supported one; otherwise the file's
+    leading bytes are checked so extensionless or misnamed files still work.
+    
+    Args:
+        file_path: Path to the input file
+        
+    Returns:
+        Tuple of ('vector' or 'raster', lowercase extension such as '.svg')
+        
+    Raises:
+        ValueError: If file type is not supported
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    
+    if ext not in VECTOR_EXTENSIONS and ext not in RASTER_EXTENSIONS:
+        try:
+            sniffed = _sniff_extension(file_path, os.path.getmtime(file_path))
+        except OSError:
+            sniffed = None
+        if sniffed is None:
+            raise ValueError(f"Unsupported file type: {ext}")
+        ext = sniffed
+    
+    return ('vector' if ext in VECTOR_EXTENSIONS else 'raster'), ext
+
+
 def detect_file_type(file_path):
     """
     Detect if input file is vector or raster based on extension.
@@ -21,19 +106,109 @@ def detect_file_type(file_path):
     Raises:
         ValueError: If file type is not supported
     """
-    ext = os.path.splitext(file_path)[1].lower()
-    vector_exts = ['.svg', '.dxf', '.ai', '.eps']
-    raster_exts = ['.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.tif']
+    return detect_file_format(file_path)[0]
+
+
+@lru_cache(maxsize=None)
+def _optional_module(name):
+    """
+    Import an optional dependency once and keep the module object.
     
-    if ext in vector_exts:
-        return 'vector'
-    elif ext in raster_exts:
-        return 'raster'
-    else:
-        raise ValueError(f"Unsupported file type: {ext}")
+    Conversions may run many times per process (batch loops, pool workers),
+    so later calls return the cached module without going through the
+    import machinery again. Failed imports are not cached.
+    
+    Args:
+        name: Dotted module name (e.g. 'cairosvg', 'ezdxf.path')
+        
+    Returns:
+        The imported module
+        
+    Raises:
+        ImportError: If the module is not installed
+    """
+    return importlib.import_module(name)
 
 
-def convert_to_svg(input_path, output_path=None, verbose=True):
+def _dxf_line_path(entity, path_data):
+    """Append SVG path data for a DXF LINE entity."""
+    start = entity.dxf.start
+    end = entity.dxf.end
+    path_data.append(f"M {start.x:.3f} {start.y:.3f} L {end.x:.3f} {end.y:.3f} ")
+
+
+def _dxf_circle_path(entity, path_data):
+    """Append SVG path data for a DXF CIRCLE entity (two half-circle arcs)."""
+    center = entity.dxf.center
+    r = entity.dxf.radius
+    path_data.append(
+        f"M {center.x + r:.3f} {center.y:.3f} "
+        f"A {r:.3f} {r:.3f} 0 1 0 {center.x - r:.3f} {center.y:.3f} "
+        f"A {r:.3f} {r:.3f} 0 1 0 {center.x + r:.3f} {center.y:.3f} Z "
+    )
+
+
+def _dxf_arc_path(entity, path_data):
+    """Append SVG path data for a DXF ARC entity."""
+    span = (entity.dxf.end_angle - entity.dxf.start_angle) % 360
+    if span == 0:
+        _dxf_circle_path(entity, path_data)
+        return
+    
+    center = entity.dxf.center
+    r = entity.dxf.radius
+    start_angle = math.radians(entity.dxf.start_angle)
+    end_angle = math.radians(entity.dxf.end_angle)
+    x0 = center.x + r * math.cos(start_angle)
+    y0 = center.y + r * math.sin(start_angle)
+    x1 = center.x + r * math.cos(end_angle)
+    y1 = center.y + r * math.sin(end_angle)
+    large_arc = 1 if span > 180 else 0
+    
+    # DXF arcs run counter-clockwise (increasing angle); coordinates are not
+    # flipped, so that is the SVG positive-angle direction (sweep flag 1)
+    path_data.append(
+        f"M {x0:.3f} {y0:.3f} "
+        f"A {r:.3f} {r:.3f} 0 {large_arc} 1 {x1:.3f} {y1:.3f} "
+    )
+
+
+# Maximum distance (in drawing units) between a curve and the line segments
+# approximating it when an entity has no exact SVG equivalent
+DXF_FLATTEN_DISTANCE = 0.01
+
+
+def _dxf_flattened_path(entity, path_data):
+    """Append any other path-like entity (polylines, splines, ellipses,
+    hatches) using ezdxf's own path construction and curve flattening."""
+    path = _optional_module('ezdxf.path')
+    
+    try:
+        entity_path = path.make_path(entity)
+    except TypeError:
+        # No geometry to cut (TEXT, POINT, ...)
+        return
+    
+    for sub_path in entity_path.sub_paths():
+        points = list(sub_path.flattening(DXF_FLATTEN_DISTANCE))
+        if len(points) < 2:
+            continue
+        path_data.append(f"M {points[0].x:.3f} {points[0].y:.3f} ")
+        path_data.append(''.join(f"L {p.x:.3f} {p.y:.3f} " for p in points[1:]))
+        if sub_path.is_closed:
+            path_data.append("Z ")
+
+
+# DXF entity type -> function appending its SVG path data; types not listed
+# here fall back to _dxf_flattened_path
+_DXF_PATH_HANDLERS = {
+    'LINE': _dxf_line_path,
+    'CIRCLE': _dxf_circle_path,
+    'ARC': _dxf_arc_path,
+}
+
+
+def convert_to_svg(input_path, output_path=None, verbose=True, ext=None):
     """
     Convert vector files to SVG format.
     Ensures clean, scalable output suitable for any device.
@@ -42,75 +217,89 @@ def convert_to_svg(input_path, output_path=None, verbose=True):
         input_path: Path to input vector file
         output_path: Optional output path (defaults to input_name_converted.svg)
         verbose: Whether to print progress messages
+        ext: Input format as returned by detect_file_format (e.g. '.dxf');
+            detected from input_path when not given
         
     Returns:
         Path to output SVG file
     """
-    ext = os.path.splitext(input_path)[1].lower()
+    if ext is None:
+        _, ext = detect_file_format(input_path)
     if output_path is None:
         output_svg = os.path.splitext(input_path)[0] + '_converted.svg'
     else:
         output_svg = output_path
     
     if ext == '.svg':
-        # Already SVG, check if it's already a converted file to avoid redundant conversions
+        # Already SVG, check if it's already a converted file to avoid redundant conversions.
+        # A caller that named the output still gets the file there
         basename = os.path.basename(input_path)
         if '_converted.svg' in basename:
             if verbose:
                 print(f"  Input is already a converted SVG, using as-is...")
-            return input_path
+            if output_path is None or os.path.abspath(output_svg) == os.path.abspath(input_path):
+                return input_path
+            shutil.copyfile(input_path, output_svg)
+            return output_svg
         
         # Copy and clean SVG for optimal scalability
         if verbose:
             print(f"  Processing SVG for clean, scalable output...")
-        with open(input_path, 'r', encoding='utf-8') as f:
-            svg_content = f.read()
-        
-        # Ensure SVG has proper viewBox for scalability
-        if 'viewBox' not in svg_content and '<svg' in svg_content:
-            # Try to add viewBox if missing (basic approach)
-            if verbose:
-                print("  Adding viewBox for better scalability...")
+            
+            # Ensure SVG has proper viewBox for scalability. Only the root
+            # <svg> tag is inspected; mmap lets find() stop there without
+            # reading the rest of the file, however long the header is
+            if os.path.getsize(input_path) > 0:
+                with open(input_path, 'rb') as f, \
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    tag_start = mm.find(b'<svg')
+                    tag_end = mm.find(b'>', tag_start) if tag_start != -1 else -1
+                    if tag_end != -1 and mm.find(b'viewBox', tag_start, tag_end) == -1:
+                        print("  Adding viewBox for better scalability...")
         
-        with open(output_svg, 'w', encoding='utf-8') as f:
-            f.write(svg_content)
+        # Content is passed through unchanged, so let the OS copy the bytes
+        # without decoding the whole file into a Python string
+        shutil.copyfile(input_path, output_svg)
             
     elif ext == '.dxf':
         # Convert DXF to SVG
         try:
-            import ezdxf
-            import svgwrite
-            
-            if verbose:
-                print(f"  Converting DXF to SVG...")
-            doc = ezdxf.readfile(input_path)
-            dwg = svgwrite.Drawing(output_svg, profile='tiny')
-            
-            # Iterate entities and add to SVG
-            for entity in doc.modelspace():
-                if entity.dxftype() == 'LINE':
-                    start = entity.dxf.start[:2]
-                    end = entity.dxf.end[:2]
-                    dwg.add(dwg.line(start=start, end=end, stroke='black'))
-                elif entity.dxftype() == 'CIRCLE':
-                    center = entity.dxf.center[:2]
-                    radius = entity.dxf.radius
-                    dwg.add(dwg.circle(center=center, r=radius, stroke='black', fill='none'))
-                elif entity.dxftype() == 'ARC':
-                    # Basic arc handling - could be expanded
-                    center = entity.dxf.center[:2]
-                    radius = entity.dxf.radius
-                    dwg.add(dwg.circle(center=center, r=radius, stroke='black', fill='none'))
-            
-            dwg.save()
-            
+            ezdxf = _optional_module('ezdxf')
+            recursive_decompose = _optional_module('ezdxf.disassemble').recursive_decompose
         except ImportError:
-            raise ImportError("ezdxf or svgwrite not installed. Install with: pip install ezdxf svgwrite")
+            raise ImportError("ezdxf not installed. Install with: pip install ezdxf")
+        
+        if verbose:
+            print(f"  Converting DXF to SVG...")
+        doc = ezdxf.readfile(input_path)
+        
+        # Collect every entity into the data of a single <path> rather than
+        # creating one SVG element per entity. Block references are expanded
+        # into their (transformed) content, so nested blocks are cut too.
+        # Lines, circles and arcs never contain sub-entities, so they are
+        # handled directly; recursive_decompose's per-entity protocol check
+        # would otherwise dominate the time on drawings made of them
+        path_data = []
+        for entity in doc.modelspace():
+            handler = _DXF_PATH_HANDLERS.get(entity.dxftype())
+            if handler is not None:
+                handler(entity, path_data)
+                continue
+            for sub_entity in recursive_decompose((entity,)):
+                handler = _DXF_PATH_HANDLERS.get(sub_entity.dxftype(), _dxf_flattened_path)
+                handler(sub_entity, path_data)
+        
+        with open(output_svg, 'w', encoding='utf-8') as f:
+            f.write('<?xml version="1.0" encoding="utf-8" ?>\n')
+            f.write('<svg xmlns="http://www.w3.org/2000/svg" version="1.2" baseProfile="tiny">\n')
+            if path_data:
+                f.write(f'<path d="{"".join(path_data).rstrip()}" stroke="black" fill="none"/>\n')
+            f.write('</svg>\n')
             
     elif ext in ['.ai', '.eps']:
         # Convert AI/EPS to SVG using Wand (requires ImageMagick)
         try:
-            from wand.image import Image as WandImage
+            WandImage = _optional_module('wand.image').Image
             
             if verbose:
                 print(f"  Converting {ext.upper()} to SVG using ImageMagick...")
@@ -124,6 +313,83 @@ def convert_to_svg(input_path, output_path=None, verbose=True):
     return output_svg
 
 
+def _open_png_source(input_path):
+    """
+    Decode a raster file into a PIL image ready to be saved as PNG.
+    
+    Args:
+        input_path: Path to input raster file
+        
+    Returns:
+        Fully loaded PIL image in RGB, RGBA or L mode
+    """
+    img = Image.open(input_path)
+    img.load()
+    
+    # Convert to RGB if necessary (some formats like CMYK need conversion)
+    if img.mode not in ('RGB', 'RGBA', 'L'):
+        img = img.convert('RGB')
+    return img
+
+
+def _save_png(img, output_png, dpi):
+    """Save an already decoded image as PNG tagged with the given DPI."""
+    img.save(output_png, dpi=(dpi, dpi), format='PNG')
+
+
+# Rasters above this many pixels are streamed through libvips (when pyvips
+# is installed) instead of being fully decoded into memory by PIL
+VIPS_MIN_PIXELS = 16_000_000
+
+
+def _vips_for(input_path):
+    """
+    Pick libvips for very large rasters.
+    
+    Args:
+        input_path: Path to input raster file
+        
+    Returns:
+        The pyvips module if it is available and the image is large enough
+        to benefit from tile streaming, otherwise None
+    """
+    try:
+        pyvips = _optional_module('pyvips')
+    except (ImportError, OSError):
+        # OSError: the Python binding is installed but libvips itself is not
+        return None
+    
+    # Opening only reads the header, the pixels are not decoded
+    with Image.open(input_path) as probe:
+        width, height = probe.size
+    return pyvips if width * height > VIPS_MIN_PIXELS else None
+
+
+def _vips_save_png(pyvips, input_path, output_png, dpi):
+    """
+    Stream a raster file to PNG with libvips, tile by tile.
+    
+    Args:
+        pyvips: The pyvips module
+        input_path: Path to input raster file
+        output_png: Path to output PNG file
+        dpi: DPI to tag the PNG with
+        
+    Returns:
+        (width, height) of the output in pixels
+    """
+    # Sequential access decodes top to bottom, so memory stays bounded by a
+    # few scanlines instead of the whole image
+    img = pyvips.Image.new_from_file(input_path, access='sequential')
+    if img.interpretation == 'cmyk':
+        img = img.colourspace('srgb')
+    
+    # libvips stores resolution in pixels per millimetre
+    img = img.copy(xres=dpi / 25.4, yres=dpi / 25.4)
+    img.pngsave(output_png)
+    return img.width, img.height
+
+
 def convert_to_high_res_png(input_path, output_path=None, dpi=300, verbose=True):
     """
     Convert raster files to high-resolution PNG (300+ DPI).
@@ -144,32 +410,260 @@ def convert_to_high_res_png(input_path, output_path=None, dpi=300, verbose=True)
     
     if verbose:
         print(f"  Converting to high-resolution PNG ({dpi} DPI)...")
-    img = Image.open(input_path)
-    
-    # Convert to RGB if necessary (some formats like CMYK need conversion)
-    if img.mode not in ('RGB', 'RGBA', 'L'):
-        img = img.convert('RGB')
-    
-    # Save with high DPI
-    img.save(output_png, dpi=(dpi, dpi), format='PNG')
+    pyvips = _vips_for(input_path)
+    if pyvips is not None:
+        size = _vips_save_png(pyvips, input_path, output_png, dpi)
+    else:
+        img = _open_png_source(input_path)
+        _save_png(img, output_png, dpi)
+        size = img.size
     if verbose:
-        print(f"  Output size: {img.size[0]}x{img.size[1]} pixels")
+        print(f"  Output size: {size[0]}x{size[1]} pixels")
     
     return output_png
 
 
-def raster_to_svg(input_path, output_path=None, threshold=128, verbose=True):
+# Rows per tracing strip are chosen so one strip is roughly this many bytes,
+# which keeps the per-strip arrays within a typical L2 cache
+TRACE_STRIP_BYTES = 256 * 1024
+
+# Write buffer for traced SVGs; large images emit millions of small rect
+# lines, and a bigger buffer turns them into a few large write() calls
+SVG_WRITE_BUFFER = 1024 * 1024
+
+# Larger rasters are downsampled before tracing; a multi-megapixel photo can
+# otherwise produce tens of millions of rects and gigabytes of SVG
+MAX_TRACE_PIXELS = 4_000_000
+
+
+def _find_runs(mask):
+    """
+    Find horizontal runs of set pixels in a 2D boolean mask.
+    
+    Run boundaries are located with a single vectorized diff over the whole
+    mask instead of walking pixels in Python.
+    
+    Args:
+        mask: 2D boolean array (True = pixel to engrave)
+        
+    Returns:
+        Tuple of (ys, x_starts, x_ends) arrays, x_ends exclusive
+    """
+    height, width = mask.shape
+    padded = np.zeros((height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    
+    # nonzero() walks row-major, so starts and ends pair up within each row
+    ys, x_starts = np.nonzero(edges == 1)
+    _, x_ends = np.nonzero(edges == -1)
+    return ys, x_starts, x_ends
+
+
+@lru_cache(maxsize=None)
+def _jit_run_finder():
+    """
+    Compile a fused threshold + run-finding kernel with Numba, if installed.
+    
+    The NumPy version in _find_runs allocates a mask, a padded copy and a
+    diff array per strip; the compiled kernel makes two passes over the
+    grayscale pixels (count, then fill) and spreads rows over all cores.
+    
+    Returns:
+        Function (gray, threshold) -> (ys, x_starts, x_ends), or None when
+        Numba is not available
+    """
+    try:
+        numba = _optional_module('numba')
+    except ImportError:
+        return None
+    
+    @numba.njit(parallel=True, cache=True)
+    def find_runs(gray, threshold):
+        height, width = gray.shape
+        
+        # Pass 1: count runs per row so every row knows where its output goes
+        counts = np.zeros(height, np.int64)
+        for y in numba.prange(height):
+            n = 0
+            inside = False
+            for x in range(width):
+                dark = gray[y, x] < threshold
+                if dark and not inside:
+                    n += 1
+                inside = dark
+            counts[y] = n
+        offsets = np.zeros(height + 1, np.int64)
+        offsets[1:] = np.cumsum(counts)
+        
+        # Pass 2: write run boundaries, rows in parallel
+        total = offsets[height]
+        ys = np.empty(total, np.int64)
+        x_starts = np.empty(total, np.int64)
+        x_ends = np.empty(total, np.int64)
+        for y in numba.prange(height):
+            k = offsets[y]
+            inside = False
+            for x in range(width):
+                dark = gray[y, x] < threshold
+                if dark and not inside:
+                    ys[k] = y
+                    x_starts[k] = x
+                    inside = True
+                elif inside and not dark:
+                    x_ends[k] = x
+                    k += 1
+                    inside = False
+            if inside:
+                x_ends[k] = width
+        return ys, x_starts, x_ends
+    
+    return find_runs
+
+
+def _grayscale_array(img):
+    """
+    Convert a PIL image to a 2D uint8 grayscale array.
+    
+    RGB(A) data is reduced with the same integer ITU-R 601-2 luma weights
+    PIL uses for convert('L'), directly on the pixel array, so no separate
+    grayscale image has to be allocated.
+    
+    Args:
+        img: PIL image
+        
+    Returns:
+        2D uint8 NumPy array
+    """
+    if img.mode == 'L':
+        return np.asarray(img, dtype=np.uint8)
+    if img.mode in ('RGB', 'RGBA'):
+        rgb = np.asarray(img, dtype=np.uint32)
+        luma = rgb[..., 0] * 19595 + rgb[..., 1] * 38470 + rgb[..., 2] * 7471 + 0x8000
+        return (luma >> 16).astype(np.uint8)
+    return np.asarray(img.convert('L'), dtype=np.uint8)
+
+
+def _iter_runs(img, threshold, strip_bytes=TRACE_STRIP_BYTES):
+    """
+    Yield dark-pixel runs of a grayscale image, one horizontal strip at a time.
+    
+    Each strip is copied into its own small array so the thresholding and
+    diff passes stay cache-resident instead of sweeping the whole image.
+    
+    Args:
+        img: PIL image in any mode
+        threshold: Grayscale threshold for black/white conversion
+        strip_bytes: Approximate working-set size of one strip
+        
+    Yields:
+        (y, x_start, x_end) tuples in row-major order, x_end exclusive
+    """
+    width, height = img.size
+    strip_rows = max(1, strip_bytes // max(width, 1))
+    jit_find_runs = _jit_run_finder()
+    
+    for y0 in range(0, height, strip_rows):
+        y1 = min(y0 + strip_rows, height)
+        strip = _grayscale_array(img.crop((0, y0, width, y1)))
+        if jit_find_runs is not None:
+            ys, x_starts, x_ends = jit_find_runs(strip, threshold)
+        else:
+            ys, x_starts, x_ends = _find_runs(strip < threshold)
+        yield from zip((ys + y0).tolist(), x_starts.tolist(), x_ends.tolist())
+
+
+def _merge_runs(runs):
+    """
+    Fuse identical runs on consecutive rows into taller rectangles.
+    
+    Args:
+        runs: Iterable of (y, x_start, x_end) tuples in row-major order
+        
+    Yields:
+        (x, y, width, height) tuples covering exactly the same pixels
+    """
+    active = {}  # (x0, x1) -> first row of the rectangle being grown
+    last_y = None
+    
+    for y, row in groupby(runs, key=itemgetter(0)):
+        spans = [(x0, x1) for _, x0, x1 in row]
+        
+        # Close rectangles that do not continue onto this row
+        if last_y is not None:
+            continued = set(spans) if y == last_y + 1 else ()
+            for span in [span for span in active if span not in continued]:
+                y_start = active.pop(span)
+                yield span[0], y_start, span[1] - span[0], last_y - y_start + 1
+        
+        for span in spans:
+            active.setdefault(span, y)
+        last_y = y
+    
+    for (x0, x1), y_start in active.items():
+        yield x0, y_start, x1 - x0, last_y - y_start + 1
+
+
+def _potrace_module():
+    """Return the potrace module (pypotrace or potracer), or None."""
+    try:
+        return _optional_module('potrace')
+    except ImportError:
+        return None
+
+
+def _potrace_path_data(potrace, mask):
+    """
+    Trace a boolean mask into SVG path data with Potrace.
+    
+    Args:
+        potrace: The potrace module (pypotrace bindings or potracer)
+        mask: 2D boolean array (True = pixel to engrave)
+        
+    Returns:
+        Path data string of Bezier outlines; holes are separate subpaths,
+        so it is meant to be filled with fill-rule="evenodd"
+    """
+    # potracer treats True as white and inverts its input, pypotrace
+    # traces the set pixels as given
+    if hasattr(potrace.Bitmap, 'invert'):
+        mask = ~mask
+    
+    def xy(point):
+        # potracer returns Point objects, pypotrace plain tuples
+        return (point.x, point.y) if hasattr(point, 'x') else tuple(point)
+    
+    parts = []
+    for curve in potrace.Bitmap(mask).trace().curves:
+        parts.append("M %.2f %.2f" % xy(curve.start_point))
+        for segment in curve.segments:
+            if segment.is_corner:
+                parts.append("L %.2f %.2f L %.2f %.2f" % (xy(segment.c) + xy(segment.end_point)))
+            else:
+                parts.append("C %.2f %.2f %.2f %.2f %.2f %.2f"
+                             % (xy(segment.c1) + xy(segment.c2) + xy(segment.end_point)))
+        parts.append("Z")
+    return " ".join(parts)
+
+
+def raster_to_svg(input_path, output_path=None, threshold=128, verbose=True,
+                  max_trace_pixels=MAX_TRACE_PIXELS, use_potrace=True):
     """
     Simple vectorization of raster images to SVG.
     
-    Note: This is a basic implementation. For production use, consider
-    using Potrace or autotrace for better results.
+    When Potrace is installed (pypotrace or potracer), the dark areas are
+    traced into smooth Bezier outlines. Otherwise every dark area is
+    covered with pixel-exact rectangles.
     
     Args:
         input_path: Path to input raster file
         output_path: Optional output path (defaults to input_name_traced.svg)
         threshold: Grayscale threshold for black/white conversion
         verbose: Whether to print progress messages
+        max_trace_pixels: Images above this pixel count are downsampled
+            before tracing (None disables the limit)
+        use_potrace: Use Potrace when it is installed (False always
+            produces rectangles)
         
     Returns:
         Path to output SVG file
@@ -179,49 +673,86 @@ def raster_to_svg(input_path, output_path=None, threshold=128, verbose=True):
     else:
         output_svg = output_path
     
-    try:
-        import svgwrite
-        
+    potrace = _potrace_module() if use_potrace else None
+    
+    if verbose:
+        print(f"  Tracing raster to SVG (threshold={threshold})...")
+        if potrace is None:
+            print("  NOTE: Basic tracing - for better results, install Potrace (pip install potracer)")
+    
+    img = Image.open(input_path)  # Converted to grayscale strip by strip
+    width, height = img.size
+    
+    # For large images, warn about file size
+    if width * height > 1000000 and verbose:
+        print(f"  WARNING: Large image ({width}x{height}). Output SVG may be very large.")
+        print(f"  Consider resizing or using proper vectorization tools.")
+    
+    # Trace on a reduced grid; the viewBox keeps that grid while width and
+    # height keep the original size, so the design scales back up
+    trace_width, trace_height = width, height
+    if max_trace_pixels and width * height > max_trace_pixels:
+        scale = math.sqrt(max_trace_pixels / (width * height))
+        trace_width = max(1, int(width * scale))
+        trace_height = max(1, int(height * scale))
+        if img.mode != 'L':
+            img = img.convert('L')
+        img = img.resize((trace_width, trace_height), Image.Resampling.LANCZOS)
         if verbose:
-            print(f"  Tracing raster to SVG (threshold={threshold})...")
-            print("  NOTE: Basic tracing - for better results, use Potrace externally")
-        
-        img = Image.open(input_path).convert('L')  # Convert to grayscale
-        width, height = img.size
-        
-        # For large images, warn about file size
-        if width * height > 1000000 and verbose:
-            print(f"  WARNING: Large image ({width}x{height}). Output SVG may be very large.")
-            print(f"  Consider resizing or using proper vectorization tools.")
-        
-        dwg = svgwrite.Drawing(output_svg, size=(width, height), profile='tiny')
-        pixels = img.load()
-        
-        # Simple pixel-to-rect conversion (creates large files)
-        # Group consecutive black pixels for slightly better optimization
-        for y in range(height):
-            x = 0
-            while x < width:
-                if pixels[x, y] < threshold:
-                    # Found black pixel, find run length
-                    run_length = 1
-                    while x + run_length < width and pixels[x + run_length, y] < threshold:
-                        run_length += 1
-                    
-                    # Add rectangle for this run
-                    dwg.add(dwg.rect(insert=(x, y), size=(run_length, 1), fill='black'))
-                    x += run_length
-                else:
-                    x += 1
-        
-        dwg.save()
+            print(f"  Downsampling to {trace_width}x{trace_height} for tracing "
+                  f"(limit: {max_trace_pixels:,} pixels)")
+    
+    # The output is nothing but flat elements, so stream them straight to
+    # the file instead of assembling the whole document in memory first
+    with open(output_svg, 'wb', buffering=SVG_WRITE_BUFFER) as out:
+        out.write(b'<?xml version="1.0" encoding="utf-8" ?>\n')
+        out.write(b'<svg xmlns="http://www.w3.org/2000/svg" version="1.2" baseProfile="tiny" '
+                  b'width="%d" height="%d" viewBox="0 0 %d %d">\n'
+                  % (width, height, trace_width, trace_height))
         
-    except ImportError:
-        raise ImportError("svgwrite not installed. Install with: pip install svgwrite")
+        if potrace is not None:
+            path_data = _potrace_path_data(potrace, _grayscale_array(img) < threshold)
+            if path_data:
+                out.write(b'<path d="%s" fill="black" fill-rule="evenodd"/>\n'
+                          % path_data.encode('ascii'))
+            out.write(b'</svg>\n')
+            return output_svg
+        
+        # Group consecutive black pixels into runs, then stack matching
+        # runs from neighbouring rows so solid areas become single rects
+        rect_tag = b'<rect x="%d" y="%d" width="%d" height="%d" fill="black"/>\n'
+        out.writelines(rect_tag % rect for rect in _merge_runs(_iter_runs(img, threshold)))
+        
+        out.write(b'</svg>\n')
     
     return output_svg
 
 
+def render_svg(input_path, dpi=300):
+    """
+    Rasterize an SVG file into a PIL image.
+    
+    Args:
+        input_path: Path to input SVG file
+        dpi: Target DPI (default: 300)
+        
+    Returns:
+        PIL Image of the rendered SVG
+    """
+    try:
+        cairosvg = _optional_module('cairosvg')
+    except ImportError:
+        raise ImportError("cairosvg not installed. Install with: pip install cairosvg")
+    
+    # Calculate scale factor for DPI (96 is default SVG DPI)
+    scale = dpi / 96.0
+    
+    png_data = cairosvg.svg2png(url=input_path, scale=scale)
+    img = Image.open(io.BytesIO(png_data))
+    img.load()
+    return img
+
+
 def svg_to_png(input_path, output_path=None, dpi=300, verbose=True):
     """
     Convert SVG to high-resolution PNG.
@@ -241,7 +772,7 @@ def svg_to_png(input_path, output_path=None, dpi=300, verbose=True):
         output_png = output_path
     
     try:
-        import cairosvg
+        cairosvg = _optional_module('cairosvg')
         
         if verbose:
             print(f"  Converting SVG to PNG ({dpi} DPI)...")
@@ -279,26 +810,33 @@ MATERIAL_SUGGESTIONS = {
     }
 }
 
+DEFAULT_MATERIAL_SUGGESTION = "General suggestion: Basswood for versatility; always test on scrap material first"
+
+# (extension, use case) -> suggestion, so a lookup is a single dict access
+_MATERIAL_LOOKUP = {
+    (ext, use_case): suggestion
+    for ext, suggestions in MATERIAL_SUGGESTIONS.items()
+    for use_case, suggestion in suggestions.items()
+}
+
 
-def suggest_material(output_path, use_case):
+def suggest_material(output_path, use_case, ext=None):
     """
     Suggest materials based on output file type and use case.
     
     Args:
         output_path: Path to output file
         use_case: Use case (e.g., 'signage', 'jewelry', 'personalization')
+        ext: Optional output extension without dot (e.g., 'svg'); skips
+            parsing output_path when the caller already knows it
         
     Returns:
         Material suggestion string
     """
-    ext = os.path.splitext(output_path)[1][1:].lower()  # Get extension without dot
-    use_case_lower = use_case.lower()
-    
-    if ext in MATERIAL_SUGGESTIONS and use_case_lower in MATERIAL_SUGGESTIONS[ext]:
-        return MATERIAL_SUGGESTIONS[ext][use_case_lower]
+    if ext is None:
+        ext = os.path.splitext(output_path)[1][1:].lower()  # Get extension without dot
     
-    # Default suggestion
-    return "General suggestion: Basswood for versatility; always test on scrap material first"
+    return _MATERIAL_LOOKUP.get((ext, use_case.lower()), DEFAULT_MATERIAL_SUGGESTION)
 
 
 def get_best_practices():
@@ -320,7 +858,8 @@ def get_best_practices():
     ]
 
 
-def convert_file(input_path, output_type='svg', dpi=300, threshold=128, use_case='general', verbose=True):
+def convert_file(input_path, output_type='svg', dpi=300, threshold=128, use_case='general', verbose=True,
+                 output_path=None):
     """
     Main conversion function that handles all file types.
     
@@ -331,6 +870,7 @@ def convert_file(input_path, output_type='svg', dpi=300, threshold=128, use_case
         threshold: Threshold for raster-to-vector tracing
         use_case: Use case for material suggestions
         verbose: Whether to print progress messages
+        output_path: Optional output path (defaults to a name next to the input)
         
     Returns:
         Dictionary with conversion results:
@@ -357,7 +897,7 @@ def convert_file(input_path, output_type='svg', dpi=300, threshold=128, use_case
             return result
         
         # Detect file type
-        file_type = detect_file_type(input_path)
+        file_type, ext = detect_file_format(input_path)
         result['file_type'] = file_type
         
         if verbose:
@@ -366,16 +906,16 @@ def convert_file(input_path, output_type='svg', dpi=300, threshold=128, use_case
         # Convert based on desired output and input type
         if output_type == 'svg':
             if file_type == 'vector':
-                output = convert_to_svg(input_path, verbose=verbose)
+                output = convert_to_svg(input_path, output_path, verbose=verbose, ext=ext)
             else:
                 # Raster to vector
-                output = raster_to_svg(input_path, threshold=threshold, verbose=verbose)
+                output = raster_to_svg(input_path, output_path, threshold=threshold, verbose=verbose)
         else:  # png
             if file_type == 'raster':
-                output = convert_to_high_res_png(input_path, dpi=dpi, verbose=verbose)
+                output = convert_to_high_res_png(input_path, output_path, dpi=dpi, verbose=verbose)
             else:
                 # Vector to raster
-                output = svg_to_png(input_path, dpi=dpi, verbose=verbose)
+                output = svg_to_png(input_path, output_path, dpi=dpi, verbose=verbose)
         
         # Get material suggestion
         suggestion = suggest_material(output, use_case)
@@ -390,7 +930,208 @@ def convert_file(input_path, output_type='svg', dpi=300, threshold=128, use_case
     return result
 
 
-def convert_file_multi_format(input_path, use_case='general', verbose=True):
+# Output formats produced by convert_file_multi_format, in report order
+MULTI_FORMAT_INFO = {
+    'svg': {
+        'label': 'SVG (scalable vector)',
+        'format': 'SVG',
+        'description': 'Scalable vector - ideal for cutting and line engraving'
+    },
+    'png_300': {
+        'label': 'PNG at 300 DPI (standard quality)',
+        'format': 'PNG 300 DPI',
+        'description': 'Standard photo engraving quality'
+    },
+    'png_600': {
+        'label': 'PNG at 600 DPI (high detail)',
+        'format': 'PNG 600 DPI',
+        'description': 'High detail for fine engraving'
+    },
+    'png_1200': {
+        'label': 'PNG at 1200 DPI (ultra precision)',
+        'format': 'PNG 1200 DPI',
+        'description': 'Ultra-precision for micro-detail work'
+    },
+}
+
+
+def _render_svg_tier(input_path, file_type, output_path, ext=None):
+    """
+    Multi-format job: produce the scalable SVG output.
+    
+    Args:
+        input_path: Path to input file
+        file_type: 'vector' or 'raster'
+        output_path: Path for the SVG
+        ext: Input format as returned by detect_file_format, so the worker
+            does not detect it again
+        
+    Returns:
+        Dictionary mapping 'svg' to the output path
+    """
+    if file_type == 'vector':
+        svg_output = convert_to_svg(input_path, output_path=output_path, verbose=False, ext=ext)
+    else:
+        svg_output = raster_to_svg(input_path, output_path=output_path, threshold=128, verbose=False)
+    return {'svg': svg_output}
+
+
+def _render_png_tiers(input_path, file_type, png_paths):
+    """
+    Multi-format job: produce the PNG outputs for every requested DPI.
+    
+    Vector sources are rasterized by cairosvg only once, at the highest DPI,
+    and the lower tiers are downsampled from that render; if that render
+    fails (a 1200 DPI bitmap can run out of memory) the next DPI is tried.
+    A failing tier does not cost the others.
+    
+    Args:
+        input_path: Path to input file
+        file_type: 'vector' or 'raster'
+        png_paths: Dictionary mapping each target DPI to its output path
+        
+    Returns:
+        Dictionary mapping 'png_<dpi>' keys to output paths, or to the
+        exception the tier failed with
+    """
+    dpis = tuple(png_paths)
+    outputs = {}
+    
+    def save_tier(dpi, save):
+        try:
+            save(png_paths[dpi])
+            outputs[f'png_{dpi}'] = png_paths[dpi]
+        except Exception as e:
+            outputs[f'png_{dpi}'] = e
+    
+    if file_type == 'raster':
+        pyvips = _vips_for(input_path)
+        if pyvips is not None:
+            # Huge sources are streamed once per tier; re-decoding is cheaper
+            # than holding the full image in memory
+            for dpi in dpis:
+                save_tier(dpi, lambda path: _vips_save_png(pyvips, input_path, path, dpi))
+            return outputs
+        
+        # Same pixels for every tier, only the DPI tag differs, so the source
+        # is decoded once and saved repeatedly
+        img = _open_png_source(input_path)
+        for dpi in dpis:
+            save_tier(dpi, lambda path: _save_png(img, path, dpi))
+        return outputs
+    
+    base = None
+    for dpi in sorted(dpis, reverse=True):
+        if base is None:
+            try:
+                base, base_dpi = render_svg(input_path, dpi=dpi), dpi
+            except Exception as e:
+                outputs[f'png_{dpi}'] = e
+                continue
+        
+        def save(path, dpi=dpi):
+            img = base
+            if dpi != base_dpi:
+                size = (max(1, round(base.width * dpi / base_dpi)),
+                        max(1, round(base.height * dpi / base_dpi)))
+                img = base.resize(size, Image.Resampling.LANCZOS)
+            _save_png(img, path, dpi)
+        
+        save_tier(dpi, save)
+    
+    return outputs
+
+
+def _multi_format_jobs(input_path, file_type, base_path, output_paths=None, ext=None):
+    """
+    Build the independent conversion jobs for convert_file_multi_format.
+    
+    Args:
+        input_path: Path to input file
+        file_type: 'vector' or 'raster'
+        base_path: Output path prefix (input path without extension)
+        output_paths: Optional dictionary mapping format keys to output paths,
+            overriding the names derived from base_path
+        ext: Input format as returned by detect_file_format
+        
+    Returns:
+        List of (format_keys, function, args) tuples; each function returns
+        a dictionary mapping its format keys to output paths, or to the
+        exception a format failed with
+    """
+    output_paths = output_paths or {}
+    dpis = (300, 600, 1200)
+    svg_path = output_paths.get('svg', base_path + '_converted.svg')
+    png_paths = {dpi: output_paths.get(f'png_{dpi}', f'{base_path}_{dpi}dpi.png') for dpi in dpis}
+    return [
+        (('svg',), _render_svg_tier, (input_path, file_type, svg_path, ext)),
+        (tuple(f'png_{dpi}' for dpi in dpis), _render_png_tiers, (input_path, file_type, png_paths)),
+    ]
+
+
+# Worker processes for convert_file_multi_format, created on first use and
+# shared by every call. They are started with forkserver (spawn where that
+# is unavailable) rather than fork: forking a threaded process such as the
+# web server can leave the child stuck on a lock another thread held.
+MULTI_FORMAT_WORKERS = 2  # One per job from _multi_format_jobs
+_multi_format_pool = None
+_multi_format_pool_lock = threading.Lock()
+
+
+def _get_multi_format_pool():
+    """
+    Return the shared worker pool for convert_file_multi_format.
+    
+    Returns:
+        ProcessPoolExecutor, or None if the jobs should run inline: on a
+        single core, or in a process that is itself a worker (a batch
+        conversion, say)
+    """
+    global _multi_format_pool
+    
+    if multiprocessing.parent_process() is not None:
+        return None
+    max_workers = min(MULTI_FORMAT_WORKERS, os.cpu_count() or 1)
+    if max_workers < 2:
+        return None
+    
+    with _multi_format_pool_lock:
+        if _multi_format_pool is None:
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _multi_format_pool = ProcessPoolExecutor(max_workers=max_workers,
+                                                     mp_context=multiprocessing.get_context(method))
+        return _multi_format_pool
+
+
+def _discard_multi_format_pool(pool):
+    """Forget a pool whose workers died, so the next call starts a new one."""
+    global _multi_format_pool
+    
+    with _multi_format_pool_lock:
+        if _multi_format_pool is pool:
+            _multi_format_pool = None
+    pool.shutdown(wait=False)
+
+
+def _submit(executor, func, *args, **kwargs):
+    """
+    Submit a job to an executor, or run it inline when executor is None.
+    
+    Returns:
+        Future holding the job's result or exception
+    """
+    if executor is not None:
+        return executor.submit(func, *args, **kwargs)
+    
+    future = Future()
+    try:
+        future.set_result(func(*args, **kwargs))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def convert_file_multi_format(input_path, use_case='general', verbose=True, output_paths=None):
     """
     Convert file to all recommended laser engraving formats.
     
@@ -404,6 +1145,8 @@ def convert_file_multi_format(input_path, use_case='general', verbose=True):
         input_path: Path to input file
         use_case: Use case for material suggestions
         verbose: Whether to print progress messages
+        output_paths: Optional dictionary mapping format keys ('svg',
+            'png_300', ...) to output paths (default: names next to the input)
         
     Returns:
         Dictionary with all conversion results:
@@ -432,99 +1175,57 @@ def convert_file_multi_format(input_path, use_case='general', verbose=True):
             result['error'] = f"File not found: {input_path}"
             return result
         
-        # Detect file type
-        file_type = detect_file_type(input_path)
+        # Detect file type once; the jobs reuse the result
+        file_type, ext = detect_file_format(input_path)
         result['file_type'] = file_type
         
         if verbose:
             print(f"  Generating all recommended formats for {file_type} file...")
         
         base_path = os.path.splitext(input_path)[0]
-        outputs = {}
+        jobs = _multi_format_jobs(input_path, file_type, base_path, output_paths, ext=ext)
         
-        # 1. Generate SVG (scalable vector)
-        try:
-            if verbose:
-                print("  [1/4] Generating SVG (scalable vector)...")
-            svg_path = base_path + '_converted.svg'
-            if file_type == 'vector':
-                svg_output = convert_to_svg(input_path, output_path=svg_path, verbose=False)
-            else:
-                svg_output = raster_to_svg(input_path, output_path=svg_path, threshold=128, verbose=False)
-            
-            outputs['svg'] = {
-                'path': svg_output,
-                'size': os.path.getsize(svg_output),
-                'suggestion': suggest_material(svg_output, use_case),
-                'format': 'SVG',
-                'description': 'Scalable vector - ideal for cutting and line engraving'
-            }
-        except Exception as e:
-            if verbose:
-                print(f"  Warning: SVG generation failed - {e}")
+        # The SVG and the PNG tiers do not depend on each other, so the jobs
+        # run side by side in the shared worker processes
+        executor = _get_multi_format_pool()
+        futures = {_submit(executor, func, *args): keys for keys, func, args in jobs}
+        results = {}
         
-        # 2. Generate PNG 300 DPI (standard quality)
-        try:
-            if verbose:
-                print("  [2/4] Generating PNG at 300 DPI (standard quality)...")
-            png_300_path = base_path + '_300dpi.png'
-            if file_type == 'raster':
-                png_300_output = convert_to_high_res_png(input_path, output_path=png_300_path, dpi=300, verbose=False)
-            else:
-                png_300_output = svg_to_png(input_path, output_path=png_300_path, dpi=300, verbose=False)
+        # Progress is reported as each format is finished
+        step = 0
+        for future in as_completed(futures):
+            try:
+                job_results = future.result()
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    _discard_multi_format_pool(executor)
+                job_results = dict.fromkeys(futures[future], e)
             
-            outputs['png_300'] = {
-                'path': png_300_output,
-                'size': os.path.getsize(png_300_output),
-                'suggestion': suggest_material(png_300_output, use_case),
-                'format': 'PNG 300 DPI',
-                'description': 'Standard photo engraving quality'
-            }
-        except Exception as e:
-            if verbose:
-                print(f"  Warning: PNG 300 DPI generation failed - {e}")
-        
-        # 3. Generate PNG 600 DPI (high detail)
-        try:
-            if verbose:
-                print("  [3/4] Generating PNG at 600 DPI (high detail)...")
-            png_600_path = base_path + '_600dpi.png'
-            if file_type == 'raster':
-                png_600_output = convert_to_high_res_png(input_path, output_path=png_600_path, dpi=600, verbose=False)
-            else:
-                png_600_output = svg_to_png(input_path, output_path=png_600_path, dpi=600, verbose=False)
-            
-            outputs['png_600'] = {
-                'path': png_600_output,
-                'size': os.path.getsize(png_600_output),
-                'suggestion': suggest_material(png_600_output, use_case),
-                'format': 'PNG 600 DPI',
-                'description': 'High detail for fine engraving'
-            }
-        except Exception as e:
-            if verbose:
-                print(f"  Warning: PNG 600 DPI generation failed - {e}")
+            for key in futures[future]:
+                step += 1
+                outcome = job_results.get(key)
+                if isinstance(outcome, Exception):
+                    if verbose:
+                        print(f"  [{step}/{len(MULTI_FORMAT_INFO)}] Warning: "
+                              f"{MULTI_FORMAT_INFO[key]['format']} generation failed - {outcome}")
+                elif outcome is not None:
+                    results[key] = outcome
+                    if verbose:
+                        print(f"  [{step}/{len(MULTI_FORMAT_INFO)}] Generated {MULTI_FORMAT_INFO[key]['label']}")
         
-        # 4. Generate PNG 1200 DPI (ultra precision)
-        try:
-            if verbose:
-                print("  [4/4] Generating PNG at 1200 DPI (ultra precision)...")
-            png_1200_path = base_path + '_1200dpi.png'
-            if file_type == 'raster':
-                png_1200_output = convert_to_high_res_png(input_path, output_path=png_1200_path, dpi=1200, verbose=False)
-            else:
-                png_1200_output = svg_to_png(input_path, output_path=png_1200_path, dpi=1200, verbose=False)
-            
-            outputs['png_1200'] = {
-                'path': png_1200_output,
-                'size': os.path.getsize(png_1200_output),
-                'suggestion': suggest_material(png_1200_output, use_case),
-                'format': 'PNG 1200 DPI',
-                'description': 'Ultra-precision for micro-detail work'
+        # Report outputs in the fixed format order regardless of completion order
+        outputs = {}
+        for key in MULTI_FORMAT_INFO:
+            if key not in results:
+                continue
+            output_path = results[key]
+            outputs[key] = {
+                'path': output_path,
+                'size': os.path.getsize(output_path),
+                'suggestion': suggest_material(output_path, use_case, ext=key.split('_')[0]),
+                'format': MULTI_FORMAT_INFO[key]['format'],
+                'description': MULTI_FORMAT_INFO[key]['description']
             }
-        except Exception as e:
-            if verbose:
-                print(f"  Warning: PNG 1200 DPI generation failed - {e}")
         
         if outputs:
             result['success'] = True
@@ -14,7 +14,7 @@ fi
 
 # Check if dependencies are installed
 echo "Checking dependencies..."
-python3 -c "import PIL, svgwrite, cairosvg, ezdxf" 2>/dev/null
+python3 -c "import PIL, numpy, cairosvg, ezdxf" 2>/dev/null
 if [ $? -ne 0 ]; then
     echo "Installing dependencies..."
     pip install -r requirements.txt
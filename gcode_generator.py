@@ -6,26 +6,87 @@ Converts SVG and PNG files to G-code for laser engravers.
 
 import os
 import math
-from typing import List, Tuple, Optional
+import re
+from typing import List, Tuple, Optional, TextIO
+import numpy as np
 from PIL import Image
 import xml.etree.ElementTree as ET
 
+from converter_core import _optional_module
+
+
+SVG_NAMESPACE = 'http://www.w3.org/2000/svg'
+
+# Moves shorter than this (in mm) on both axes are treated as zero-length
+MOVE_EPSILON = 1e-4
+
+# Bezier curves are cut as straight segments of about this length (in mm)
+BEZIER_SEGMENT_LENGTH = 0.5
+BEZIER_MAX_SEGMENTS = 64
+
+# Output buffer size; programs are streamed to disk instead of being held
+# in memory as one list of lines
+GCODE_WRITE_BUFFER = 1 << 20
+
+
+def _load_grayscale(input_path: str) -> np.ndarray:
+    """
+    Load an image as a 2D uint8 grayscale array.
+    
+    OpenCV decodes straight to a grayscale array when it is installed;
+    otherwise PIL is used, converting only when the image is not already
+    single-channel. OpenCV is told to ignore EXIF orientation, as PIL
+    does, so both give the same shape; grayscale images decode to the same
+    values, while colour images may differ by one gray level because the
+    image libraries round the colour conversion differently.
+    
+    Args:
+        input_path: Path to image file
+        
+    Returns:
+        2D uint8 NumPy array
+    """
+    try:
+        cv2 = _optional_module('cv2')
+    except ImportError:
+        cv2 = None
+    
+    if cv2 is not None:
+        arr = cv2.imread(input_path, cv2.IMREAD_GRAYSCALE | cv2.IMREAD_IGNORE_ORIENTATION)
+        if arr is not None:
+            return arr
+    
+    with Image.open(input_path) as img:
+        if img.mode != 'L':
+            img = img.convert('L')
+        return np.asarray(img, dtype=np.uint8)
+
 
 class GCodeGenerator:
     """Generate G-code for laser engraving from image files."""
     
-    def __init__(self, work_area=(300, 200), units='mm'):
+    def __init__(self, work_area=(300, 200), units='mm', arc_mode='native', chord_tol=0.2):
         """
         Initialize G-code generator.
         
         Args:
             work_area: (width, height) of machine work area
             units: 'mm' or 'inches'
+            arc_mode: 'native' cuts circles and arcs with G2/G3; 'polyline'
+                cuts them as short G1 segments, for controllers whose
+                planner stalls on long arcs
+            chord_tol: Maximum segment length in mm for 'polyline' arcs
         """
+        if arc_mode not in ('native', 'polyline'):
+            raise ValueError(f"Unsupported arc mode: {arc_mode}")
         self.work_area = work_area
         self.units = units
+        self.arc_mode = arc_mode
+        self.chord_tol = chord_tol
         self.feed_rate = 1000  # mm/min
         self.laser_power_max = 1000  # S parameter max value
+        self.power = 0  # S value for vector cuts, set by generate_from_svg
+        self._reset_modal_state()
     
     def generate_from_png(self, input_path: str, output_path: str, 
                           line_spacing: float = 0.1, 
@@ -44,67 +105,133 @@ class GCodeGenerator:
         Returns:
             Path to generated G-code file
         """
-        # Load and convert image to grayscale
-        img = Image.open(input_path).convert('L')
-        width, height = img.size
-        pixels = img.load()
+        # Load the image as grayscale
+        brightness = _load_grayscale(input_path)
+        height, width = brightness.shape
         
         # Calculate scaling to fit work area
         scale_x = self.work_area[0] / width
         scale_y = self.work_area[1] / height
         scale = min(scale_x, scale_y)
         
-        # Generate G-code
-        gcode_lines = []
+        # Laser power for each of the 256 brightness levels (inverted: darker =
+        # more power); rows are mapped through this table with one gather
+        # instead of redoing the float math for every pixel
+        power_lut = (power_max - (np.arange(256) / 255.0) * (power_max - power_min)).astype(np.int32)
+        x_positions = np.arange(width) * scale
         
-        # Header
-        gcode_lines.extend(self._generate_header())
+        # Coordinates repeat on every row, so they are formatted only once
+        x_text = np.array([_fmt(x) for x in x_positions.tolist()])
         
         # Raster scan - line by line
         y_step = line_spacing
         num_lines = int(height * scale / y_step)
         
-        for line_num in range(num_lines):
-            y_pixel = int(line_num * y_step / scale)
-            if y_pixel >= height:
-                break
-            
-            y_pos = line_num * y_step
+        # Rows are formatted as whole blocks of text and written straight
+        # to the file rather than collected as one string per move
+        with open(output_path, 'w', buffering=GCODE_WRITE_BUFFER) as out:
+            # Header
+            _write_lines(out, self._generate_header())
             
-            # Scan left to right (or right to left alternating for efficiency)
-            if line_num % 2 == 0:
-                # Left to right
-                x_range = range(width)
-                reverse = False
-            else:
-                # Right to left
-                x_range = range(width - 1, -1, -1)
-                reverse = True
-            
-            for x_pixel in x_range:
-                x_pos = x_pixel * scale
+            for line_num in range(num_lines):
+                y_pixel = int(line_num * y_step / scale)
+                if y_pixel >= height:
+                    break
                 
-                # Get pixel brightness (0=black, 255=white)
-                brightness = pixels[x_pixel, y_pixel]
+                y_pos = line_num * y_step
                 
-                # Convert to laser power (inverted: darker = more power)
-                power = int(power_max - (brightness / 255.0) * (power_max - power_min))
+                # Scan left to right (or right to left alternating for efficiency)
+                row = power_lut[brightness[y_pixel]]
+                x_row = x_text
+                x_pos_row = x_positions
+                if line_num % 2 == 1:
+                    row = row[::-1]
+                    x_row = x_row[::-1]
+                    x_pos_row = x_pos_row[::-1]
                 
-                # Move to position and set laser power
-                if power > power_min:
-                    gcode_lines.append(f"G1 X{x_pos:.3f} Y{y_pos:.3f} S{power} F{self.feed_rate}")
-                else:
-                    # Move with laser off
-                    gcode_lines.append(f"G0 X{x_pos:.3f} Y{y_pos:.3f} S0")
+                # Blank rows are skipped outright, and the laser-off margins
+                # of a row are replaced by one travel move to where the first
+                # burned span starts
+                burning = np.flatnonzero(row > power_min)
+                start = max(int(burning[0]) - 1, 0) if burning.size else 0
+                stop = int(burning[-1]) + 1 if burning.size else 0
+                if stop <= start + 1:
+                    continue
+                self._emit_move(out, "G0", float(x_pos_row[start]), y_pos, s=0)
+                
+                out.write(self._raster_row(x_row[start + 1:stop], _fmt(y_pos),
+                                           row[start + 1:stop], power_min))
+                out.write('\n')
+            
+            # Footer
+            _write_lines(out, self._generate_footer())
+        
+        return output_path
+    
+    def _raster_row(self, x_text, y_text: str, row, power_min: int) -> str:
+        """
+        Format one raster scan row as G-code, with array operations.
+        
+        The head is expected to be at the start of the row already. Pixels
+        above power_min are burned with G1 at their power; the rest are
+        laser-off G0 moves. A span of pixels sharing the same power is a
+        single straight move, so only its end point is emitted. Modal words
+        are left out as in _emit_move.
+        
+        Args:
+            x_text: Formatted X coordinate of every pixel, in scan order
+            y_text: Formatted Y coordinate of the row
+            row: Laser power of every pixel, in scan order
+            power_min: Power at or below which the laser stays off
+            
+        Returns:
+            The row's G-code lines joined by newlines
+        """
+        burn = row > power_min
+        power = np.where(burn, row, 0)
         
-        # Footer
-        gcode_lines.extend(self._generate_footer())
+        # Keep the last pixel of every constant-power span
+        keep = np.empty(len(row), dtype=bool)
+        keep[:-1] = power[:-1] != power[1:]
+        keep[-1] = True
         
-        # Write to file
-        with open(output_path, 'w') as f:
-            f.write('\n'.join(gcode_lines))
+        burn = burn[keep]
+        power = power[keep]
+        motion = np.where(burn, "G1", "G0")
         
-        return output_path
+        # Compare every move with the one before it to find changed words
+        prev_motion = np.empty_like(motion)
+        prev_motion[0] = self._last_motion or ""
+        prev_motion[1:] = motion[:-1]
+        prev_power = np.empty_like(power)
+        prev_power[0] = -1 if self._last_power is None else self._last_power
+        prev_power[1:] = power[:-1]
+        
+        motion_words = np.where(motion != prev_motion, np.char.add(motion, " "), "")
+        power_words = np.where(power != prev_power, np.char.add(" S", power.astype(str)), "")
+        
+        # Y is modal too and constant along the row, so at most the first
+        # move of the row carries it
+        y_words = np.zeros(len(power), dtype=f"<U{len(y_text) + 2}")
+        if self._last_xy_text is None or self._last_xy_text[1] != y_text:
+            y_words[0] = f" Y{y_text}"
+        
+        lines = np.char.add(motion_words, "X")
+        lines = np.char.add(lines, x_text[keep])
+        lines = np.char.add(lines, y_words)
+        lines = np.char.add(lines, power_words)
+        
+        # Feed rate only needs to be set on the first burn of the program
+        if self._last_feed != self.feed_rate and burn.any():
+            first_burn = int(np.argmax(burn))
+            lines[first_burn] = f"{lines[first_burn]} F{self.feed_rate}"
+            self._last_feed = self.feed_rate
+        
+        self._last_motion = str(motion[-1])
+        self._last_power = int(power[-1])
+        self._last_xy = None  # Only known as text here
+        self._last_xy_text = (str(x_text[-1]), y_text)
+        return '\n'.join(lines.tolist())
     
     def generate_from_svg(self, input_path: str, output_path: str,
                           power: int = 800,
@@ -122,44 +249,51 @@ class GCodeGenerator:
             Path to generated G-code file
         """
         self.feed_rate = speed
-        
-        # Parse SVG
-        tree = ET.parse(input_path)
-        root = tree.getroot()
+        self.power = power
         
         # Get SVG namespace
-        ns = {'svg': 'http://www.w3.org/2000/svg'}
-        
-        gcode_lines = []
-        
-        # Header
-        gcode_lines.extend(self._generate_header())
+        ns = {'svg': SVG_NAMESPACE}
         
-        # Set laser power for vector mode
-        gcode_lines.append(f"S{power}  ; Set laser power")
+        # Exact tag -> handler, for namespaced and bare (namespace-less) SVGs
+        handlers = {}
+        for name, handler in (('line', self._process_line), ('rect', self._process_rect),
+                              ('circle', self._process_circle), ('path', self._process_path)):
+            handlers[name] = handler
+            handlers[f'{{{SVG_NAMESPACE}}}{name}'] = handler
         
-        # Process paths and lines
-        for elem in root.iter():
-            if 'line' in elem.tag.lower():
-                self._process_line(elem, gcode_lines, ns)
-            elif 'rect' in elem.tag.lower():
-                self._process_rect(elem, gcode_lines, ns)
-            elif 'circle' in elem.tag.lower():
-                self._process_circle(elem, gcode_lines, ns)
-            elif 'path' in elem.tag.lower():
-                self._process_path(elem, gcode_lines, ns)
-        
-        # Footer
-        gcode_lines.extend(self._generate_footer())
-        
-        # Write to file
-        with open(output_path, 'w') as f:
-            f.write('\n'.join(gcode_lines))
+        # Moves are written to the file as they are generated
+        with open(output_path, 'w', buffering=GCODE_WRITE_BUFFER) as out:
+            # Header
+            _write_lines(out, self._generate_header())
+            
+            # Set laser power for vector mode
+            out.write(f"S{power}  ; Set laser power\n")
+            self._last_power = power
+            
+            # Process paths and lines while the SVG is parsed, instead of
+            # building the whole document tree first. Shapes are leaves, so
+            # their end events arrive in document order
+            for _, elem in ET.iterparse(input_path, events=('end',)):
+                handler = handlers.get(elem.tag)
+                if handler is not None:
+                    handler(elem, out, ns)
+                    # Done with this shape; drop its attributes and text
+                    elem.clear()
+            
+            # Footer
+            _write_lines(out, self._generate_footer())
         
         return output_path
     
     def _generate_header(self) -> List[str]:
         """Generate G-code header."""
+        # Every program starts from the header's own G0/S0, so the modal
+        # state tracked by _emit_move starts over as well
+        self._reset_modal_state()
+        self._last_motion = "G0"
+        self._last_power = 0
+        self._last_xy = (0.0, 0.0)
+        self._last_xy_text = ("0", "0")
         return [
             "; G-code generated by Laser Engraving File Converter",
             "; Units: mm",
@@ -177,7 +311,64 @@ class GCodeGenerator:
             "; End of program",
         ]
     
-    def _process_line(self, elem, gcode_lines: List[str], ns):
+    def _reset_modal_state(self):
+        """Forget the motion mode, power and feed rate last sent."""
+        self._last_motion = None
+        self._last_power = None
+        self._last_feed = None
+        self._last_xy = None
+        self._last_xy_text = None
+    
+    def _emit_move(self, out: TextIO, motion: str, x: float, y: float,
+                   s: Optional[int] = None, f: Optional[float] = None,
+                   params: str = ""):
+        """
+        Append a move, leaving out words the controller already has.
+        
+        G0/G1/G2/G3, X, Y, S and F are modal, so they are written only when
+        they change. This keeps programs smaller and lets more real moves fit
+        in the controller's serial buffer. Moves that end where the head
+        already is are dropped entirely.
+        
+        Args:
+            out: Text stream the G-code is written to
+            motion: Motion command ('G0', 'G1', 'G2' or 'G3')
+            x, y: Target position
+            s: Laser power for the move (None keeps the current power)
+            f: Feed rate for the move (None keeps the current feed rate)
+            params: Extra words such as arc centre offsets, placed after X/Y
+        """
+        if (self._last_xy is not None
+                and abs(x - self._last_xy[0]) < MOVE_EPSILON
+                and abs(y - self._last_xy[1]) < MOVE_EPSILON):
+            # Zero length; for arcs SVG treats equal end points as no arc too
+            return
+        self._last_xy = (x, y)
+        
+        words = []
+        # Arcs always repeat their command so each line reads on its own
+        if motion != self._last_motion or motion in ("G2", "G3"):
+            words.append(motion)
+            self._last_motion = motion
+        x_text, y_text = _fmt(x), _fmt(y)
+        last_text = self._last_xy_text or (None, None)
+        if x_text != last_text[0]:
+            words.append(f"X{x_text}")
+        if y_text != last_text[1]:
+            words.append(f"Y{y_text}")
+        self._last_xy_text = (x_text, y_text)
+        if params:
+            words.append(params)
+        if s is not None and s != self._last_power:
+            words.append(f"S{s}")
+            self._last_power = s
+        if f is not None and f != self._last_feed:
+            words.append(f"F{f}")
+            self._last_feed = f
+        out.write(" ".join(words))
+        out.write("\n")
+    
+    def _process_line(self, elem, out: TextIO, ns):
         """Process SVG line element."""
         x1 = float(elem.get('x1', 0))
         y1 = float(elem.get('y1', 0))
@@ -185,11 +376,11 @@ class GCodeGenerator:
         y2 = float(elem.get('y2', 0))
         
         # Move to start with laser off
-        gcode_lines.append(f"G0 X{x1:.3f} Y{y1:.3f} S0")
+        self._emit_move(out, "G0", x1, y1, s=0)
         # Cut line with laser on
-        gcode_lines.append(f"G1 X{x2:.3f} Y{y2:.3f} F{self.feed_rate}")
+        self._emit_move(out, "G1", x2, y2, s=self.power, f=self.feed_rate)
     
-    def _process_rect(self, elem, gcode_lines: List[str], ns):
+    def _process_rect(self, elem, out: TextIO, ns):
         """Process SVG rectangle element."""
         x = float(elem.get('x', 0))
         y = float(elem.get('y', 0))
@@ -197,15 +388,20 @@ class GCodeGenerator:
         height = float(elem.get('height', 0))
         
         # Move to start
-        gcode_lines.append(f"G0 X{x:.3f} Y{y:.3f} S0")
+        self._emit_move(out, "G0", x, y, s=0)
+        
+        if width == 0 or height == 0:
+            # Degenerate rectangle: cut its single line once, not twice
+            self._emit_move(out, "G1", x + width, y + height, s=self.power, f=self.feed_rate)
+            return
         
         # Cut rectangle (clockwise)
-        gcode_lines.append(f"G1 X{x + width:.3f} Y{y:.3f} F{self.feed_rate}")
-        gcode_lines.append(f"G1 X{x + width:.3f} Y{y + height:.3f}")
-        gcode_lines.append(f"G1 X{x:.3f} Y{y + height:.3f}")
-        gcode_lines.append(f"G1 X{x:.3f} Y{y:.3f}")
+        self._emit_move(out, "G1", x + width, y, s=self.power, f=self.feed_rate)
+        self._emit_move(out, "G1", x + width, y + height)
+        self._emit_move(out, "G1", x, y + height)
+        self._emit_move(out, "G1", x, y)
     
-    def _process_circle(self, elem, gcode_lines: List[str], ns):
+    def _process_circle(self, elem, out: TextIO, ns):
         """Process SVG circle element."""
         cx = float(elem.get('cx', 0))
         cy = float(elem.get('cy', 0))
@@ -214,59 +410,181 @@ class GCodeGenerator:
         # Move to start point (right side of circle)
         start_x = cx + r
         start_y = cy
-        gcode_lines.append(f"G0 X{start_x:.3f} Y{start_y:.3f} S0")
+        self._emit_move(out, "G0", start_x, start_y, s=0)
+        
+        if self.arc_mode == 'polyline':
+            # Full clockwise turn, matching the G2 arcs below
+            self._polyline_arc(out, cx, cy, r, 0.0, -2 * math.pi)
+            return
         
         # Use arc command to draw circle (two 180° arcs)
-        gcode_lines.append(f"G2 X{cx - r:.3f} Y{cy:.3f} I{-r:.3f} J0 F{self.feed_rate}")
-        gcode_lines.append(f"G2 X{start_x:.3f} Y{start_y:.3f} I{r:.3f} J0")
+        self._emit_move(out, "G2", cx - r, cy, s=self.power, f=self.feed_rate,
+                        params=f"I{_fmt(-r)} J0")
+        self._emit_move(out, "G2", start_x, start_y, params=f"I{_fmt(r)} J0")
     
-    def _process_path(self, elem, gcode_lines: List[str], ns):
+    def _process_path(self, elem, out: TextIO, ns):
         """Process SVG path element (simplified - handles basic paths)."""
         d = elem.get('d', '')
         
         if not d:
             return
         
-        # Very basic path parsing - only handles M (move) and L (line) commands
-        # For production, use a proper SVG parser library
-        commands = d.replace(',', ' ').split()
-        
-        current_x, current_y = 0, 0
-        laser_on = False
+        # Basic path parsing - handles M (move), L/H/V (lines), C (cubic
+        # Bezier), circular A (arc) and Z (close), absolute and relative.
+        # S/Q/T curves are skipped
+        current_x, current_y = 0.0, 0.0
+        start_x, start_y = 0.0, 0.0
         
-        i = 0
-        while i < len(commands):
-            cmd = commands[i]
+        for cmd, args in _path_segments(d):
+            command = cmd.upper()
             
-            if cmd == 'M' and i + 2 < len(commands):
-                # Move to
-                try:
-                    x = float(commands[i + 1])
-                    y = float(commands[i + 2])
-                    gcode_lines.append(f"G0 X{x:.3f} Y{y:.3f} S0")
-                    current_x, current_y = x, y
-                    laser_on = False
-                    i += 3
-                except ValueError:
-                    i += 1
+            if command == 'Z':
+                # Close path back to the subpath start
+                if (current_x, current_y) != (start_x, start_y):
+                    self._emit_move(out, "G1", start_x, start_y, s=self.power, f=self.feed_rate)
+                    current_x, current_y = start_x, start_y
+                continue
             
-            elif cmd == 'L' and i + 2 < len(commands):
-                # Line to
-                try:
-                    x = float(commands[i + 1])
-                    y = float(commands[i + 2])
-                    if not laser_on:
-                        gcode_lines.append(f"G1 X{x:.3f} Y{y:.3f} F{self.feed_rate}")
-                        laser_on = True
-                    else:
-                        gcode_lines.append(f"G1 X{x:.3f} Y{y:.3f}")
-                    current_x, current_y = x, y
-                    i += 3
-                except ValueError:
-                    i += 1
+            size = _PATH_ARG_COUNTS.get(command)
+            if size is None:
+                continue
             
-            else:
-                i += 1
+            # A command letter may be followed by several argument groups
+            for k in range(0, len(args) - size + 1, size):
+                p = args[k:k + size]
+                # Relative (lowercase) commands are offsets from the current point
+                ox, oy = (current_x, current_y) if cmd != command else (0.0, 0.0)
+                
+                if command == 'M' and k == 0:
+                    # Move to
+                    x, y = ox + p[0], oy + p[1]
+                    self._emit_move(out, "G0", x, y, s=0)
+                    start_x, start_y = x, y
+                elif command in ('M', 'L'):
+                    # Line to (extra pairs after M are implicit line-tos)
+                    x, y = ox + p[0], oy + p[1]
+                    self._emit_move(out, "G1", x, y, s=self.power, f=self.feed_rate)
+                elif command == 'H':
+                    x, y = ox + p[0], current_y
+                    self._emit_move(out, "G1", x, y, s=self.power, f=self.feed_rate)
+                elif command == 'V':
+                    x, y = current_x, oy + p[0]
+                    self._emit_move(out, "G1", x, y, s=self.power, f=self.feed_rate)
+                elif command == 'C':
+                    # Cubic Bezier to (e.g. Potrace outlines)
+                    x, y = ox + p[4], oy + p[5]
+                    self._cubic_move(out, current_x, current_y, ox + p[0], oy + p[1],
+                                     ox + p[2], oy + p[3], x, y)
+                else:
+                    # Circular arc to (rx == ry, no rotation)
+                    x, y = ox + p[5], oy + p[6]
+                    self._arc_move(out, current_x, current_y, x, y, p[0], p[3] != 0, p[4] != 0)
+                
+                current_x, current_y = x, y
+    
+    def _cubic_move(self, out: TextIO, x0: float, y0: float, x1: float, y1: float,
+                    x2: float, y2: float, x3: float, y3: float):
+        """
+        Append a cubic Bezier curve as a series of short G1 moves.
+        
+        The number of segments follows the length of the control polygon,
+        so each segment is at most about BEZIER_SEGMENT_LENGTH long.
+        """
+        length = (math.hypot(x1 - x0, y1 - y0) + math.hypot(x2 - x1, y2 - y1)
+                  + math.hypot(x3 - x2, y3 - y2))
+        steps = max(1, min(BEZIER_MAX_SEGMENTS, math.ceil(length / BEZIER_SEGMENT_LENGTH)))
+        
+        for step in range(1, steps + 1):
+            t = step / steps
+            u = 1 - t
+            a, b, c, d = u * u * u, 3 * u * u * t, 3 * u * t * t, t * t * t
+            self._emit_move(out, "G1",
+                            a * x0 + b * x1 + c * x2 + d * x3,
+                            a * y0 + b * y1 + c * y2 + d * y3,
+                            s=self.power, f=self.feed_rate)
+    
+    def _arc_move(self, out: TextIO, x1: float, y1: float, x2: float, y2: float,
+                  r: float, large_arc: bool, sweep: bool):
+        """
+        Append an SVG circular arc segment as a G2/G3 move.
+        
+        Uses the SVG endpoint-to-center conversion; the SVG sweep flag
+        (positive-angle direction) maps to G3 since coordinates are
+        passed through without flipping Y.
+        """
+        hx = (x1 - x2) / 2
+        hy = (y1 - y2) / 2
+        d2 = hx * hx + hy * hy
+        
+        # Radius too small to reach the end point is scaled up, as per the SVG spec
+        r = max(abs(r), math.sqrt(d2))
+        coef = math.sqrt(max(0.0, (r * r - d2) / d2)) if d2 else 0.0
+        if large_arc == sweep:
+            coef = -coef
+        
+        cx = coef * hy + (x1 + x2) / 2
+        cy = -coef * hx + (y1 + y2) / 2
+        
+        if self.arc_mode == 'polyline':
+            start_angle = math.atan2(y1 - cy, x1 - cx)
+            sweep_angle = math.atan2(y2 - cy, x2 - cx) - start_angle
+            # Positive sweep is counter-clockwise (G3), negative clockwise (G2)
+            if sweep and sweep_angle <= 0:
+                sweep_angle += 2 * math.pi
+            elif not sweep and sweep_angle >= 0:
+                sweep_angle -= 2 * math.pi
+            self._polyline_arc(out, cx, cy, r, start_angle, sweep_angle)
+            return
+        
+        command = "G3" if sweep else "G2"
+        self._emit_move(out, command, x2, y2, s=self.power, f=self.feed_rate,
+                        params=f"I{_fmt(cx - x1)} J{_fmt(cy - y1)}")
+    
+    def _polyline_arc(self, out: TextIO, cx: float, cy: float, r: float,
+                      start_angle: float, sweep_angle: float):
+        """
+        Cut a circular arc as straight G1 segments.
+        
+        A full circle gets at least 32 segments, and no segment is longer
+        than chord_tol; all points are computed in one array operation.
+        """
+        turns = abs(sweep_angle) / (2 * math.pi)
+        steps = max(math.ceil(32 * turns), math.ceil(abs(sweep_angle) * r / self.chord_tol), 1)
+        angles = start_angle + np.linspace(0.0, sweep_angle, steps + 1)[1:]
+        points = np.column_stack((cx + r * np.cos(angles), cy + r * np.sin(angles)))
+        
+        for x, y in points.tolist():
+            self._emit_move(out, "G1", x, y, s=self.power, f=self.feed_rate)
+
+
+# One path command letter or one number per match; commas and whitespace
+# between them are simply skipped
+_PATH_TOKEN = re.compile(r'([MmZzLlHhVvCcSsQqTtAa])|([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)')
+
+# Numbers consumed by each supported path command
+_PATH_ARG_COUNTS = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'A': 7}
+
+
+def _path_segments(d: str) -> List[Tuple[str, List[float]]]:
+    """Split SVG path data into (command letter, numbers) pairs."""
+    segments = []
+    for command, number in _PATH_TOKEN.findall(d):
+        if command:
+            segments.append((command, []))
+        elif segments:
+            segments[-1][1].append(float(number))
+    return segments
+
+
+def _write_lines(out: TextIO, lines: List[str]):
+    """Write a block of G-code lines, one per line."""
+    out.writelines(line + "\n" for line in lines)
+
+
+def _fmt(value: float) -> str:
+    """Format a coordinate with 3 decimals, dropping trailing zeros."""
+    text = f"{value:.3f}".rstrip('0').rstrip('.')
+    return '0' if text == '-0' else text
 
 
 def generate_gcode_from_file(input_path: str, output_path: str = None,
@@ -15,15 +15,23 @@ Output Formats:
 """
 
 import argparse
+import contextlib
+import io
 import os
 import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image
+import converter_core
 
 
 def detect_file_type(file_path):
     """
     Detect if input file is vector or raster based on extension.
     
+    Delegates to converter_core, which checks the extension against
+    frozensets and falls back to sniffing the file's leading bytes.
+    
     Args:
         file_path: Path to the input file
         
@@ -33,93 +41,29 @@ def detect_file_type(file_path):
     Raises:
         ValueError: If file type is not supported
     """
-    ext = os.path.splitext(file_path)[1].lower()
-    vector_exts = ['.svg', '.dxf', '.ai', '.eps']
-    raster_exts = ['.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.tif']
-    
-    if ext in vector_exts:
-        return 'vector'
-    elif ext in raster_exts:
-        return 'raster'
-    else:
-        raise ValueError(f"Unsupported file type: {ext}")
+    return converter_core.detect_file_type(file_path)
 
 
-def convert_to_svg(input_path):
+def convert_to_svg(input_path, ext=None):
     """
     Convert vector files to SVG format.
     
+    Delegates to converter_core, which writes the SVG text directly
+    instead of building an svgwrite document.
+    
     Args:
         input_path: Path to input vector file
+        ext: Input format (e.g. '.dxf') if the caller already detected it
         
     Returns:
         Path to output SVG file
     """
-    ext = os.path.splitext(input_path)[1].lower()
-    output_svg = os.path.splitext(input_path)[0] + '_converted.svg'
-    
-    if ext == '.svg':
-        # Already SVG, check if it's already a converted file to avoid redundant conversions
-        basename = os.path.basename(input_path)
-        if '_converted.svg' in basename:
-            print(f"  Input is already a converted SVG, using as-is...")
-            return input_path
-        
-        # Copy with optimization
-        print(f"  Input is already SVG format, copying...")
-        with open(input_path, 'r', encoding='utf-8') as f:
-            svg_content = f.read()
-        with open(output_svg, 'w', encoding='utf-8') as f:
-            f.write(svg_content)
-            
-    elif ext == '.dxf':
-        # Convert DXF to SVG
-        try:
-            import ezdxf
-            import svgwrite
-            
-            print(f"  Converting DXF to SVG...")
-            doc = ezdxf.readfile(input_path)
-            dwg = svgwrite.Drawing(output_svg, profile='tiny')
-            
-            # Iterate entities and add to SVG
-            for entity in doc.modelspace():
-                if entity.dxftype() == 'LINE':
-                    start = entity.dxf.start[:2]
-                    end = entity.dxf.end[:2]
-                    dwg.add(dwg.line(start=start, end=end, stroke='black'))
-                elif entity.dxftype() == 'CIRCLE':
-                    center = entity.dxf.center[:2]
-                    radius = entity.dxf.radius
-                    dwg.add(dwg.circle(center=center, r=radius, stroke='black', fill='none'))
-                elif entity.dxftype() == 'ARC':
-                    # Basic arc handling - could be expanded
-                    center = entity.dxf.center[:2]
-                    radius = entity.dxf.radius
-                    dwg.add(dwg.circle(center=center, r=radius, stroke='black', fill='none'))
-            
-            dwg.save()
-            
-        except ImportError:
-            print("  WARNING: ezdxf or svgwrite not installed. Install with: pip install ezdxf svgwrite")
-            raise
-            
-    elif ext in ['.ai', '.eps']:
-        # Convert AI/EPS to SVG using Wand (requires ImageMagick)
-        try:
-            from wand.image import Image as WandImage
-            
-            print(f"  Converting {ext.upper()} to SVG using ImageMagick...")
-            with WandImage(filename=input_path) as img:
-                img.format = 'svg'
-                img.save(filename=output_svg)
-                
-        except ImportError:
-            print("  WARNING: Wand not installed. Install with: pip install wand")
+    try:
+        return converter_core.convert_to_svg(input_path, ext=ext)
+    except ImportError:
+        if ext in ('.ai', '.eps'):
             print("  NOTE: Wand requires ImageMagick to be installed on your system")
-            raise
-    
-    return output_svg
+        raise
 
 
 def convert_to_high_res_png(input_path, dpi=300):
@@ -149,63 +93,22 @@ def convert_to_high_res_png(input_path, dpi=300):
     return output_png
 
 
-def raster_to_svg(input_path, threshold=128):
+def raster_to_svg(input_path, threshold=128, use_potrace=True):
     """
     Simple vectorization of raster images to SVG.
     
-    Note: This is a basic implementation. For production use, consider
-    using Potrace or autotrace for better results.
+    Delegates to converter_core so the CLI and web interface share the
+    same vectorized tracing implementation.
     
     Args:
         input_path: Path to input raster file
         threshold: Grayscale threshold for black/white conversion
+        use_potrace: Use Potrace outlines when it is installed
         
     Returns:
         Path to output SVG file
     """
-    output_svg = os.path.splitext(input_path)[0] + '_traced.svg'
-    
-    try:
-        import svgwrite
-        
-        print(f"  Tracing raster to SVG (threshold={threshold})...")
-        print("  NOTE: Basic tracing - for better results, use Potrace externally")
-        
-        img = Image.open(input_path).convert('L')  # Convert to grayscale
-        width, height = img.size
-        
-        # For large images, warn about file size
-        if width * height > 1000000:
-            print(f"  WARNING: Large image ({width}x{height}). Output SVG may be very large.")
-            print(f"  Consider resizing or using proper vectorization tools.")
-        
-        dwg = svgwrite.Drawing(output_svg, size=(width, height), profile='tiny')
-        pixels = img.load()
-        
-        # Simple pixel-to-rect conversion (creates large files)
-        # Group consecutive black pixels for slightly better optimization
-        for y in range(height):
-            x = 0
-            while x < width:
-                if pixels[x, y] < threshold:
-                    # Found black pixel, find run length
-                    run_length = 1
-                    while x + run_length < width and pixels[x + run_length, y] < threshold:
-                        run_length += 1
-                    
-                    # Add rectangle for this run
-                    dwg.add(dwg.rect(insert=(x, y), size=(run_length, 1), fill='black'))
-                    x += run_length
-                else:
-                    x += 1
-        
-        dwg.save()
-        
-    except ImportError:
-        print("  WARNING: svgwrite not installed. Install with: pip install svgwrite")
-        raise
-    
-    return output_svg
+    return converter_core.raster_to_svg(input_path, threshold=threshold, use_potrace=use_potrace)
 
 
 def svg_to_png(input_path, dpi=300):
@@ -238,49 +141,24 @@ def svg_to_png(input_path, dpi=300):
     return output_png
 
 
-# Material suggestions based on research
-# Sources: xometry.com, heatsign.com, youtube.com (laser engraving tutorials)
-MATERIAL_SUGGESTIONS = {
-    'svg': {
-        'signage': 'Acrylic or plywood (clear cuts, durable, weather-resistant)',
-        'jewelry': 'Anodized aluminum or acrylic (precise details, lightweight)',
-        'personalization': 'Leather or wood (scalable designs, natural look)',
-        'photos': 'Not ideal for SVG; convert to raster for shading on wood or slate',
-        'general': 'Basswood or birch plywood (versatile, affordable, good for testing)',
-        'industrial': 'Stainless steel or anodized aluminum (durable, precise)',
-        'arts': 'Acrylic or bamboo (aesthetic appeal, various colors)',
-    },
-    'png': {
-        'signage': 'Wood or MDF (high-res for visibility, cost-effective)',
-        'jewelry': 'Not recommended; use vector (SVG) for precision work',
-        'personalization': 'Slate or leather (photo engraving, unique textures)',
-        'photos': 'Wood, slate, or ceramic tile (300+ DPI for detail)',
-        'general': 'Basswood (excellent for photo engraving, smooth surface)',
-        'industrial': 'Anodized aluminum (for photo marking with proper laser settings)',
-        'arts': 'Cork or leather (natural texture enhances engraving)',
-    }
-}
+# Material suggestions based on research; the table lives in converter_core
+# so the CLI and the web interface share one flattened lookup
+MATERIAL_SUGGESTIONS = converter_core.MATERIAL_SUGGESTIONS
 
 
-def suggest_material(output_path, use_case):
+def suggest_material(output_path, use_case, ext=None):
     """
     Suggest materials based on output file type and use case.
     
     Args:
         output_path: Path to output file
         use_case: Use case (e.g., 'signage', 'jewelry', 'personalization')
+        ext: Optional output extension without dot (e.g., 'svg')
         
     Returns:
         Material suggestion string
     """
-    ext = os.path.splitext(output_path)[1][1:].lower()  # Get extension without dot
-    use_case_lower = use_case.lower()
-    
-    if ext in MATERIAL_SUGGESTIONS and use_case_lower in MATERIAL_SUGGESTIONS[ext]:
-        return MATERIAL_SUGGESTIONS[ext][use_case_lower]
-    
-    # Default suggestion
-    return "General suggestion: Basswood for versatility; always test on scrap material first"
+    return converter_core.suggest_material(output_path, use_case, ext=ext)
 
 
 def print_best_practices():
@@ -299,6 +177,78 @@ def print_best_practices():
     print("="*70 + "\n")
 
 
+def _convert_one(input_file, args):
+    """
+    Convert a single input file and print the results.
+    
+    Args:
+        input_file: Path to the input file
+        args: Parsed command line arguments
+    """
+    print(f"\nProcessing: {input_file}")
+    
+    # Check if file exists
+    if not os.path.exists(input_file):
+        print(f"  ERROR: File not found: {input_file}")
+        return
+    
+    try:
+        # Detect file type; the format is passed on so it is not re-parsed
+        file_type, ext = converter_core.detect_file_format(input_file)
+        print(f"  Detected: {file_type} file")
+        
+        # Convert based on desired output and input type
+        if args.output_type == 'svg':
+            if file_type == 'vector':
+                output = convert_to_svg(input_file, ext=ext)
+            else:
+                # Raster to vector
+                output = raster_to_svg(input_file, threshold=args.threshold)
+        else:  # png
+            if file_type == 'raster':
+                output = convert_to_high_res_png(input_file, dpi=args.dpi)
+            else:
+                # Vector to raster
+                output = svg_to_png(input_file, dpi=args.dpi)
+        
+        # Get material suggestion
+        suggestion = suggest_material(output, args.use_case, ext=args.output_type)
+        
+        # Print results
+        print(f"  ✓ Converted to: {output}")
+        print(f"  Material suggestion for '{args.use_case}':")
+        print(f"    {suggestion}")
+        
+    except ValueError as e:
+        print(f"  ERROR: {e}")
+    except ImportError as e:
+        print(f"  ERROR: Missing dependency - {e}")
+        print(f"  Install all dependencies with: pip install -r requirements.txt")
+    except Exception as e:
+        print(f"  ERROR: Unexpected error - {e}")
+        # Goes to stdout so it is kept with the file's other messages
+        traceback.print_exc(file=sys.stdout)
+
+
+def _process_one(input_file, args):
+    """
+    Worker entry point for parallel conversion.
+    
+    Output is captured so messages from different files do not interleave.
+    
+    Args:
+        input_file: Path to the input file
+        args: Parsed command line arguments
+        
+    Returns:
+        Everything the conversion printed
+    """
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        _convert_one(input_file, args)
+    return buffer.getvalue()
+
+
 def main():
     """Main program entry point."""
     parser = argparse.ArgumentParser(
@@ -309,6 +259,7 @@ Examples:
   %(prog)s input.jpg --output-type svg --use-case photos
   %(prog)s design.dxf logo.png --output-type svg --use-case signage
   %(prog)s photo.jpg --output-type png --dpi 600 --use-case personalization
+  %(prog)s *.jpg --output-type svg --jobs 4
   
 Use Cases:
   signage, jewelry, personalization, photos, general, industrial, arts
@@ -348,6 +299,13 @@ Use Cases:
         help="Threshold for raster-to-vector tracing (0-255) - default: 128"
     )
     
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        help="Number of files to convert in parallel (0 = one per CPU core) - default: 1"
+    )
+    
     parser.add_argument(
         '--best-practices',
         action='store_true',
@@ -374,51 +332,20 @@ Use Cases:
     print("LASER ENGRAVING FILE CONVERTER")
     print("="*70)
     
-    # Process each input file
-    for input_file in args.input_files:
-        print(f"\nProcessing: {input_file}")
-        
-        # Check if file exists
-        if not os.path.exists(input_file):
-            print(f"  ERROR: File not found: {input_file}")
-            continue
-        
-        try:
-            # Detect file type
-            file_type = detect_file_type(input_file)
-            print(f"  Detected: {file_type} file")
-            
-            # Convert based on desired output and input type
-            if args.output_type == 'svg':
-                if file_type == 'vector':
-                    output = convert_to_svg(input_file)
-                else:
-                    # Raster to vector
-                    output = raster_to_svg(input_file, threshold=args.threshold)
-            else:  # png
-                if file_type == 'raster':
-                    output = convert_to_high_res_png(input_file, dpi=args.dpi)
-                else:
-                    # Vector to raster
-                    output = svg_to_png(input_file, dpi=args.dpi)
-            
-            # Get material suggestion
-            suggestion = suggest_material(output, args.use_case)
-            
-            # Print results
-            print(f"  ✓ Converted to: {output}")
-            print(f"  Material suggestion for '{args.use_case}':")
-            print(f"    {suggestion}")
-            
-        except ValueError as e:
-            print(f"  ERROR: {e}")
-        except ImportError as e:
-            print(f"  ERROR: Missing dependency - {e}")
-            print(f"  Install all dependencies with: pip install -r requirements.txt")
-        except Exception as e:
-            print(f"  ERROR: Unexpected error - {e}")
-            import traceback
-            traceback.print_exc()
+    # Process each input file; files are independent, so with --jobs they
+    # are converted in parallel worker processes
+    jobs = args.jobs or os.cpu_count() or 1
+    if jobs == 1 or len(args.input_files) == 1:
+        for input_file in args.input_files:
+            _convert_one(input_file, args)
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(args.input_files))) as executor:
+            futures = [executor.submit(_process_one, input_file, args)
+                       for input_file in args.input_files]
+            # Each worker's messages arrive as one block and are written in
+            # the order the files were given, whichever finishes first
+            for future in futures:
+                sys.stdout.write(future.result())
     
     print("\n" + "="*70)
     print("Processing complete!")
@@ -10,9 +10,29 @@ outputs high-definition files, and suggests materials based on use cases.
 import os
 import sys
 import argparse
+import contextlib
+import functools
+import io
 import shutil
+import types
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, Tuple, Optional, Any, Mapping
+
+
+# Bytes read from the top of an SVG when looking for its XML declaration
+SVG_HEAD_BYTES = 4096
+
+# Chunk size for copying files through
+COPY_BUFFER_SIZE = 1 << 20
+
+# Pillow image modes PNG can store as-is; anything else (CMYK, YCbCr, ...)
+# is converted to RGB(A) first
+PNG_MODES = frozenset({'1', 'L', 'LA', 'I', 'I;16', 'P', 'RGB', 'RGBA'})
+
+# zlib level for written PNGs (0-9); 1 is several times faster than the
+# default of 6 for a modestly larger file
+PNG_COMPRESS_LEVEL = 1
 
 
 class MaterialSuggestion:
@@ -47,25 +67,39 @@ class MaterialSuggestion:
     }
     
     @classmethod
-    def suggest(cls, use_case: str) -> Dict[str, Any]:
-        """Suggest materials based on use case."""
+    @functools.lru_cache(maxsize=128)
+    def suggest(cls, use_case: str) -> Mapping[str, Any]:
+        """
+        Suggest materials based on use case.
+        
+        Results are cached per use case string, so the returned mapping
+        (and its materials tuple) is read-only: every caller asking for the
+        same use case shares it.
+        """
         use_case_lower = use_case.lower()
         
+        # An exact use case name is a plain hash lookup; no key contains
+        # another, so it is the same match the substring scan would find
+        if use_case_lower in cls.MATERIAL_DATABASE:
+            matches = ((use_case_lower, cls.MATERIAL_DATABASE[use_case_lower]),)
+        else:
+            matches = cls.MATERIAL_DATABASE.items()
+        
         # Find matching use case
-        for key, value in cls.MATERIAL_DATABASE.items():
+        for key, value in matches:
             if key in use_case_lower or use_case_lower in key:
-                return {
+                return types.MappingProxyType({
                     'use_case': key,
-                    'materials': value['materials'],
+                    'materials': tuple(value['materials']),
                     'description': value['description']
-                }
+                })
         
         # Default suggestion if no match
-        return {
+        return types.MappingProxyType({
             'use_case': 'general',
-            'materials': ['Wood (Birch, Maple)', 'Acrylic (3mm-6mm)', 'Leather'],
+            'materials': ('Wood (Birch, Maple)', 'Acrylic (3mm-6mm)', 'Leather'),
             'description': 'General purpose materials suitable for most laser engraving projects'
-        }
+        })
     
     @classmethod
     def list_all_use_cases(cls) -> List[str]:
@@ -76,41 +110,53 @@ class MaterialSuggestion:
 class FileConverter:
     """Handles file conversion for laser engraving."""
     
-    VECTOR_FORMATS = ['.svg', '.dxf', '.ai', '.eps']
-    RASTER_FORMATS = ['.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.tif']
+    VECTOR_FORMATS = frozenset({'.svg', '.dxf', '.ai', '.eps'})
+    RASTER_FORMATS = frozenset({'.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.tif'})
+    
+    # Extension -> (is_vector, is_raster), so one lookup classifies a file
+    FORMAT_KINDS = {
+        **dict.fromkeys(VECTOR_FORMATS, (True, False)),
+        **dict.fromkeys(RASTER_FORMATS, (False, True)),
+    }
     
     def __init__(self):
-        self.supported_formats = self.VECTOR_FORMATS + self.RASTER_FORMATS
+        self.supported_formats = self.VECTOR_FORMATS | self.RASTER_FORMATS
+    
+    @staticmethod
+    def _extension(file_path: str) -> str:
+        """Lowercased extension with the dot, without building a Path."""
+        return os.path.splitext(file_path)[1].lower()
     
     def is_vector(self, file_path: str) -> bool:
         """Check if file is a vector format."""
-        ext = Path(file_path).suffix.lower()
-        return ext in self.VECTOR_FORMATS
+        return self._extension(file_path) in self.VECTOR_FORMATS
     
     def is_raster(self, file_path: str) -> bool:
         """Check if file is a raster format."""
-        ext = Path(file_path).suffix.lower()
-        return ext in self.RASTER_FORMATS
+        return self._extension(file_path) in self.RASTER_FORMATS
     
     def is_supported(self, file_path: str) -> bool:
         """Check if file format is supported."""
-        ext = Path(file_path).suffix.lower()
-        return ext in self.supported_formats
+        return self._extension(file_path) in self.FORMAT_KINDS
     
     def get_file_info(self, file_path: str) -> Dict[str, Any]:
         """Get information about the input file."""
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"File not found: {file_path}")
+        # One stat call gives both the existence check and the size
+        try:
+            size_bytes = os.stat(file_path).st_size
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {file_path}") from None
         
-        path = Path(file_path)
+        ext = self._extension(file_path)
+        is_vector, is_raster = self.FORMAT_KINDS.get(ext, (False, False))
         info = {
-            'name': path.name,
-            'extension': path.suffix.lower(),
-            'size_bytes': os.path.getsize(file_path),
-            'size_mb': round(os.path.getsize(file_path) / (1024 * 1024), 2),
-            'is_vector': self.is_vector(file_path),
-            'is_raster': self.is_raster(file_path),
-            'supported': self.is_supported(file_path)
+            'name': os.path.basename(file_path),
+            'extension': ext,
+            'size_bytes': size_bytes,
+            'size_mb': round(size_bytes / (1024 * 1024), 2),
+            'is_vector': is_vector,
+            'is_raster': is_raster,
+            'supported': is_vector or is_raster
         }
         
         return info
@@ -151,12 +197,14 @@ class FileConverter:
         return True
     
     def convert_raster_to_png(self, input_file: str, output_file: str,
-                              target_dpi: int = 300, max_dimension: int = 4096) -> bool:
+                              target_dpi: int = 300, max_dimension: int = 4096,
+                              preserve_metadata: bool = False) -> bool:
         """
         Convert raster formats to high-resolution PNG.
         
-        Note: This is a placeholder implementation. For production use,
-        you would need PIL/Pillow library.
+        Uses Pillow when it is installed; otherwise only conversion guidance
+        and an info file are written. Images larger than max_dimension on
+        either side are scaled down before saving.
         """
         info = self.get_file_info(input_file)
         
@@ -167,7 +215,27 @@ class FileConverter:
         
         # For PNG files, we can copy or optimize
         if input_ext == '.png':
-            return self._copy_or_optimize_png(input_file, output_file)
+            return self._copy_or_optimize_png(input_file, output_file, preserve_metadata)
+        
+        try:
+            from PIL import Image
+        except ImportError:
+            Image = None
+        
+        if Image is not None:
+            with Image.open(input_file) as img:
+                # draft() lets JPEG decode straight at a reduced scale when
+                # the image is far larger than needed
+                img.draft(None, (max_dimension, max_dimension))
+                if img.mode not in PNG_MODES:
+                    img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+                img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+                # Low zlib effort: PNG encoding time is dominated by
+                # compression, and engraving software does not care about size
+                img.save(output_file, 'PNG', dpi=(target_dpi, target_dpi),
+                         compress_level=PNG_COMPRESS_LEVEL)
+            print(f"✓ PNG file created: {output_file}")
+            return True
         
         # For other raster formats, provide guidance
         print(f"\nNote: Converting {input_ext} to PNG requires PIL/Pillow library.")
@@ -182,24 +250,40 @@ class FileConverter:
     
     def _copy_or_optimize_svg(self, input_file: str, output_file: str) -> bool:
         """Copy or optimize SVG file."""
-        with open(input_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Add metadata comment for laser engraving
-        if '<?xml' in content:
-            parts = content.split('?>', 1)
-            if len(parts) == 2:
-                content = parts[0] + '?>\n<!-- Optimized for Laser Engraving -->\n' + parts[1]
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(content)
+        # The metadata comment goes right after the XML declaration, which
+        # sits at the top of the file, so only the head is inspected and the
+        # rest is copied through without loading it into memory. The copy
+        # goes to a temporary file first: the default output for an .svg
+        # input is the input itself, which must not be truncated while read
+        temp_file = output_file + '.tmp'
+        with open(input_file, 'rb') as src, open(temp_file, 'wb') as dst:
+            head = src.read(SVG_HEAD_BYTES)
+            
+            # Add metadata comment for laser engraving
+            prolog = head.find(b'<?xml')
+            end = head.find(b'?>', prolog) if prolog != -1 else -1
+            if end != -1:
+                end += 2
+                head = head[:end] + b'\n<!-- Optimized for Laser Engraving -->\n' + head[end:]
+            
+            dst.write(head)
+            shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+        os.replace(temp_file, output_file)
         
         print(f"✓ SVG file optimized: {output_file}")
         return True
     
-    def _copy_or_optimize_png(self, input_file: str, output_file: str) -> bool:
-        """Copy PNG file (in production, would optimize)."""
-        shutil.copy2(input_file, output_file)
+    def _copy_or_optimize_png(self, input_file: str, output_file: str,
+                              preserve_metadata: bool = False) -> bool:
+        """
+        Copy PNG file (in production, would optimize).
+        
+        shutil.copyfile lets the OS copy the bytes directly (sendfile on
+        Linux); timestamps and permissions are only copied on request.
+        """
+        shutil.copyfile(input_file, output_file)
+        if preserve_metadata:
+            shutil.copystat(input_file, output_file)
         print(f"✓ PNG file prepared: {output_file}")
         return True
     
@@ -246,6 +330,119 @@ class FileConverter:
         print(f"✓ Conversion info created: {info_file}")
 
 
+def _batch_output_names(converter: "FileConverter", input_files: List[str]) -> List[str]:
+    """
+    Choose an output file name for every input of a batch.
+    
+    Inputs that share a stem (logo.png and logo.jpg) would otherwise be
+    written to the same output by different workers; later ones get the
+    input extension added (logo_jpg.png). Names are compared without case,
+    as case-insensitive file systems would.
+    
+    Args:
+        converter: FileConverter used to classify the inputs
+        input_files: Input paths, in batch order
+        
+    Returns:
+        Output file names, in the same order
+    """
+    names = []
+    taken = set()
+    for input_file in input_files:
+        stem, ext = os.path.splitext(os.path.basename(input_file))
+        out_ext = '.svg' if converter.is_vector(input_file) else '.png'
+        name = stem + out_ext
+        if name.lower() in taken:
+            base = f"{stem}_{ext.lstrip('.').lower()}"
+            name = base + out_ext
+            counter = 2
+            while name.lower() in taken:
+                name = f"{base}_{counter}{out_ext}"
+                counter += 1
+        taken.add(name.lower())
+        names.append(name)
+    return names
+
+
+def _batch_convert_one(input_file: str, output_file: str, args) -> Tuple[bool, str]:
+    """
+    Worker entry point for --batch: convert one file.
+    
+    Output is captured so messages from different files do not interleave.
+    
+    Args:
+        input_file: Path to the input file
+        output_file: Path the converted file is written to
+        args: Parsed command line arguments
+        
+    Returns:
+        Tuple of (whether the conversion succeeded, everything it printed)
+    """
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        converter = FileConverter()
+        try:
+            if converter.is_vector(input_file):
+                success = converter.convert_vector_to_svg(input_file, output_file)
+            else:
+                success = converter.convert_raster_to_png(input_file, output_file,
+                                                          target_dpi=args.dpi,
+                                                          max_dimension=args.max_dimension,
+                                                          preserve_metadata=args.preserve_metadata)
+        except Exception as e:
+            print(f"Error converting {input_file}: {e}")
+            success = False
+    return bool(success), buffer.getvalue()
+
+
+def _run_batch(args) -> int:
+    """
+    Convert every supported file in args.batch, in parallel processes.
+    
+    Args:
+        args: Parsed command line arguments
+        
+    Returns:
+        Process exit code; 1 if any file failed to convert
+    """
+    if not os.path.isdir(args.batch):
+        print(f"Error: Not a directory: {args.batch}")
+        return 1
+    
+    converter = FileConverter()
+    with os.scandir(args.batch) as entries:
+        input_files = sorted(entry.path for entry in entries
+                             if entry.is_file() and converter.is_supported(entry.path))
+    if not input_files:
+        print(f"No supported files found in {args.batch}")
+        return 0
+    
+    output_dir = args.output or os.path.join(args.batch, 'converted')
+    os.makedirs(output_dir, exist_ok=True)
+    output_files = [os.path.join(output_dir, name)
+                    for name in _batch_output_names(converter, input_files)]
+    
+    # Files are independent, so each one is converted in its own worker
+    # process; results are printed in file order as one block per file
+    jobs = args.jobs or os.cpu_count() or 1
+    failed = 0
+    with ProcessPoolExecutor(max_workers=min(jobs, len(input_files))) as executor:
+        futures = [executor.submit(_batch_convert_one, input_file, output_file, args)
+                   for input_file, output_file in zip(input_files, output_files)]
+        for future in futures:
+            success, output = future.result()
+            sys.stdout.write(output)
+            if not success:
+                failed += 1
+    
+    if failed:
+        print(f"\n✗ {failed} of {len(input_files)} files failed to convert; "
+              f"the rest are in {output_dir}\n")
+        return 1
+    print(f"\n✓ Processed {len(input_files)} files into {output_dir}\n")
+    return 0
+
+
 def main():
     """Main program entry point."""
     parser = argparse.ArgumentParser(
@@ -259,6 +456,9 @@ Examples:
   # Convert a raster file to high-res PNG
   %(prog)s -i photo.jpg -o output.png --dpi 600
   
+  # Convert every supported file in a folder, in parallel
+  %(prog)s --batch designs/ -o designs_converted/
+  
   # Get material suggestions
   %(prog)s --suggest-material decorative
   
@@ -277,11 +477,17 @@ Supported Input Formats:
     parser.add_argument('-i', '--input', type=str, 
                        help='Input file path')
     parser.add_argument('-o', '--output', type=str,
-                       help='Output file path (default: auto-generated)')
+                       help='Output file path, or output directory with --batch (default: auto-generated)')
+    parser.add_argument('--batch', type=str, metavar='DIR',
+                       help='Convert every supported file in DIR (output default: DIR/converted)')
+    parser.add_argument('--jobs', type=int, default=0,
+                       help='Parallel worker processes for --batch (default: 0 = one per CPU core)')
     parser.add_argument('--dpi', type=int, default=300,
                        help='Target DPI for raster output (default: 300)')
     parser.add_argument('--max-dimension', type=int, default=4096,
                        help='Maximum dimension for raster output (default: 4096)')
+    parser.add_argument('--preserve-metadata', action='store_true',
+                       help='Keep the input file\'s timestamps and permissions on copied output')
     parser.add_argument('--suggest-material', type=str,
                        help='Get material suggestions for a use case')
     parser.add_argument('--list-use-cases', action='store_true',
@@ -317,6 +523,10 @@ Supported Input Formats:
         print("\n" + "="*60 + "\n")
         return 0
     
+    # Handle batch conversion of a whole directory
+    if args.batch:
+        return _run_batch(args)
+    
     # Require input file for conversion operations
     if not args.input:
         parser.print_help()
@@ -345,7 +555,7 @@ Supported Input Formats:
         # Check if format is supported
         if not info['supported']:
             print(f"Error: Unsupported file format: {info['extension']}")
-            print(f"Supported formats: {', '.join(converter.supported_formats)}")
+            print(f"Supported formats: {', '.join(sorted(converter.supported_formats))}")
             return 1
         
         # Determine output file
@@ -366,7 +576,8 @@ Supported Input Formats:
         else:
             converter.convert_raster_to_png(args.input, args.output, 
                                            target_dpi=args.dpi,
-                                           max_dimension=args.max_dimension)
+                                           max_dimension=args.max_dimension,
+                                           preserve_metadata=args.preserve_metadata)
         
         print(f"\n✓ Conversion completed successfully!")
         print(f"Output: {args.output}\n")
@@ -5,15 +5,28 @@ Handles detection, connection, and control of laser engraving machines via USB/S
 """
 
 import os
+import re
+import json
+import atexit
+import logging
+import logging.handlers
+import mmap
+import sys
+import queue
 import time
 import threading
-from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass, asdict
+import contextlib
+import functools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Iterator, Optional, Tuple
+from dataclasses import dataclass
 from enum import Enum
 
 try:
     import serial
     import serial.tools.list_ports
+    import serial.threaded
     SERIAL_AVAILABLE = True
 except ImportError:
     SERIAL_AVAILABLE = False
@@ -29,6 +42,49 @@ except ImportError:
     print("Info: pybluez not installed. Bluetooth device detection disabled.")
     print("Install with: pip install pybluez (optional for Bluetooth engravers)")
 
+# Progress and errors from the controller; see _start_log_listener
+_log = logging.getLogger("improved_enigma.machine")
+_log_listener: Optional[logging.handlers.QueueListener] = None
+
+# Seconds a device scan stays valid; UIs poll for devices far more often
+# than devices get plugged in, and enumerating ports is slow on Windows
+SCAN_CACHE_TTL = 0.5
+
+# Seconds the serial port list stays valid. On Windows, listing ports opens
+# every Bluetooth COM port for its manufacturer, a stall of seconds per port
+PORTS_CACHE_TTL = 2.0
+
+# Size of GRBL's serial receive buffer; streamed lines are kept within it
+GRBL_RX_BUFFER_SIZE = 128
+
+# Seconds between status queries while connected
+STATUS_POLL_INTERVAL = 1.0
+
+# Seconds to wait for the machine to answer a command
+REPLY_TIMEOUT = 2.0
+
+# Seconds a streamed file waits on a machine that sends nothing at all, not
+# even status reports, before giving up; while the planner is full a long
+# move can hold back the next ok for much longer, but the machine still
+# answers the status queries
+STREAM_STALL_TIMEOUT = 10.0
+
+# GRBL realtime commands: single bytes picked out of the stream as soon as
+# they arrive, which never get an ok/error reply of their own
+_REALTIME_COMMANDS = frozenset('?!~\x18')
+
+# A G-code line to send, without surrounding whitespace; blank lines and
+# lines starting with ';' or '(' (comments) never match
+_GCODE_LINE_RE = re.compile(rb'^[ \t]*([^;(\s](?:[^\r\n]*[^\s])?)', re.MULTILINE)
+
+# Bluetooth address -> name and serial (RFCOMM) channel of devices seen
+# before; resolving a name or querying a device's services costs seconds,
+# so known devices skip those steps on later scans and connects
+BT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.config', 'improved-enigma', 'bt_cache.json')
+
+# Seconds to wait for a Bluetooth device to report its name
+BT_NAME_LOOKUP_TIMEOUT = 2
+
 
 class MachineStatus(Enum):
     """Machine status states."""
@@ -58,7 +114,59 @@ class ConnectionType(Enum):
     UNKNOWN = "Unknown"
 
 
-@dataclass
+# GRBL status report, e.g. <Run|MPos:1.000,2.000,0.000|FS:500,0> (GRBL 1.1)
+# or <Idle,MPos:0.000,0.000,0.000,WPos:...> (GRBL 0.9); the state (with an
+# optional sub-state such as Hold:0), machine position and feed rate are
+# all extracted by one match
+_GRBL_STATUS_RE = re.compile(
+    rb'<(?P<state>[A-Za-z]+)[^|,>]*'
+    rb'(?:[^>]*?MPos:(?P<x>-?[\d.]+),(?P<y>-?[\d.]+)(?:,(?P<z>-?[\d.]+))?)?'
+    rb'(?:[^>]*?\|FS?:(?P<feed>[\d.]+))?',
+    re.ASCII
+)
+
+# GRBL state -> machine status; other states leave the status unchanged
+_GRBL_STATES = {
+    b'Idle': MachineStatus.IDLE,
+    b'Run': MachineStatus.RUNNING,
+    b'Hold': MachineStatus.PAUSED,
+    b'Home': MachineStatus.HOMING,
+    b'Alarm': MachineStatus.ALARM,
+}
+
+# Serial port description keywords, scanned in a single regex pass
+_PORT_KEYWORDS_RE = re.compile(
+    r'(?P<firmware>grbl|cnc|laser)|(?P<marlin>marlin)|(?P<smoothie>smoothie)|(?P<chip>ch34[01])',
+    re.IGNORECASE
+)
+
+# Keyword group -> machine type, highest priority first
+_PORT_KEYWORD_TYPES = (
+    ('firmware', MachineType.GRBL),
+    ('marlin', MachineType.MARLIN),
+    ('smoothie', MachineType.SMOOTHIE),
+    ('chip', MachineType.GRBL),  # CH340/CH341 chips are commonly used with GRBL
+)
+
+# Bluetooth device name keywords, scanned in a single regex pass
+_BLUETOOTH_KEYWORDS_RE = re.compile(
+    r'(?P<brand>neje|xtool|laserpecker)|(?P<marlin>marlin)|(?P<firmware>grbl|cnc)',
+    re.IGNORECASE
+)
+
+# Keyword group -> machine type, highest priority first
+_BLUETOOTH_KEYWORD_TYPES = (
+    ('brand', MachineType.GRBL),  # Most desktop engravers use GRBL
+    ('marlin', MachineType.MARLIN),
+    ('firmware', MachineType.GRBL),
+)
+
+
+# Slotted dataclasses (no per-instance __dict__) need Python 3.10+
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_SLOTS)
 class MachineInfo:
     """Information about a detected machine."""
     port: str
@@ -73,14 +181,97 @@ class MachineInfo:
     connected: bool = False
     bluetooth_address: Optional[str] = None  # For Bluetooth devices
     signal_strength: Optional[int] = None  # For Bluetooth/WiFi devices
+    position: Optional[Tuple[float, ...]] = None  # Last reported machine position (mm)
+    feed_rate: Optional[float] = None  # Last reported feed rate
     
     def to_dict(self):
         """Convert to dictionary for JSON serialization."""
-        data = asdict(self)
-        data['machine_type'] = self.machine_type.value
-        data['status'] = self.status.value
-        data['connection_type'] = self.connection_type.value
-        return data
+        # Written out rather than dataclasses.asdict(), which deep-copies
+        # every field only for the enums to be replaced afterwards
+        return {
+            'port': self.port,
+            'name': self.name,
+            'description': self.description,
+            'machine_type': self.machine_type.value,
+            'status': self.status.value,
+            'connection_type': self.connection_type.value,
+            'serial_number': self.serial_number,
+            'firmware_version': self.firmware_version,
+            'work_area': self.work_area,
+            'connected': self.connected,
+            'bluetooth_address': self.bluetooth_address,
+            'signal_strength': self.signal_strength,
+            'position': self.position,
+            'feed_rate': self.feed_rate,
+        }
+
+
+def _start_log_listener():
+    """
+    Print this module's log messages from a background thread.
+    
+    Scans and the serial reader run on worker threads; they only put
+    records on a queue instead of waiting for the stdout lock. Nothing is
+    changed if the application has already given the logger a handler.
+    """
+    global _log_listener
+    if _log_listener is not None or _log.handlers:
+        return
+    
+    records = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    _log_listener = logging.handlers.QueueListener(records, handler)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)  # Prints whatever is still queued
+    
+    _log.addHandler(logging.handlers.QueueHandler(records))
+    _log.setLevel(logging.INFO)
+    _log.propagate = False
+
+
+class _GrblLineReader:
+    """
+    serial.threaded protocol that splits what the machine sends into lines.
+    
+    Status reports (<Idle|...>) are handed to on_status the moment they
+    arrive; the startup banner (Grbl 1.1h ...), sent again after every soft
+    reset, calls on_reset; every other line is a reply and goes on the
+    replies queue for whoever sent the command.
+    """
+    
+    def __init__(self, replies: queue.Queue, on_status, on_reset):
+        self.replies = replies
+        self.on_status = on_status
+        self.on_reset = on_reset
+        self.buffer = bytearray()
+        self.last_heard = time.monotonic()  # When the machine last sent a line
+    
+    def connection_made(self, transport):
+        pass
+    
+    def data_received(self, data: bytes):
+        buffer = self.buffer
+        buffer += data
+        while True:
+            end = buffer.find(b'\n')
+            if end == -1:
+                return
+            line = bytes(buffer[:end]).strip()
+            del buffer[:end + 1]
+            if not line:
+                continue
+            
+            self.last_heard = time.monotonic()
+            if line.startswith(b'<'):
+                self.on_status(line)
+            elif line.startswith(b'Grbl '):
+                self.on_reset()
+            else:
+                self.replies.put(line)
+    
+    def connection_lost(self, exc):
+        pass
 
 
 class MachineController:
@@ -99,49 +290,93 @@ class MachineController:
         # Add more as needed
     ]
     
+    # (vid, pid) -> machine type, so identifying a port is one dict lookup
+    _VIDPID_INDEX = {(device["vid"], device["pid"]): device["type"] for device in KNOWN_DEVICES}
+    
     # Keywords to identify Bluetooth laser engravers
     BLUETOOTH_LASER_KEYWORDS = [
         "laser", "engraver", "engrav", "neje", "xtool", "laserpecker",
         "ortur", "atomstack", "sculpfun", "cnc", "grbl"
     ]
     
+    # All keywords in one case-insensitive pattern, matched in a single scan
+    _LASER_NAME_RE = re.compile('|'.join(map(re.escape, BLUETOOTH_LASER_KEYWORDS)), re.IGNORECASE)
+    
     def __init__(self):
         """Initialize the machine controller."""
+        _start_log_listener()
         self.machines: Dict[str, MachineInfo] = {}
         self.active_connection: Optional[serial.Serial] = None
         self.active_bluetooth_socket = None
         self.active_port: Optional[str] = None
         self.monitoring_thread: Optional[threading.Thread] = None
-        self.should_monitor = False
+        self._stop_monitor = threading.Event()  # Set to end the monitoring thread
+        self._streaming = False  # A file is being streamed over serial
+        # Set by stop, emergency stop, disconnect and a machine reset to end
+        # a file being streamed
+        self._abort_stream = threading.Event()
+        # Held by whoever is waiting for a reply on the serial port, so two
+        # senders never take each other's replies
+        self._serial_lock = threading.Lock()
+        # Reads the serial port in the background (see _GrblLineReader)
+        self._reader: Optional["serial.threaded.ReaderThread"] = None
+        self._replies: "queue.Queue[bytes]" = queue.Queue()
+        self._last_scan_time = float('-inf')
+        self._last_scan_result: List[MachineInfo] = []
+        self._ports_cache: Optional[Tuple[float, list]] = None  # (time, ports)
+        self._bt_cache: Optional[Dict[str, dict]] = None  # Loaded on first scan
     
-    def scan_devices(self) -> List[MachineInfo]:
+    def scan_devices(self, force: bool = False) -> List[MachineInfo]:
         """
         Scan for connected laser engraving machines (USB/Serial and Bluetooth).
         
+        Results are reused for SCAN_CACHE_TTL seconds.
+        
+        Args:
+            force: Scan again even if a recent result or port list is available
+            
         Returns:
             List of detected machines
         """
-        detected_machines = []
+        if not force and time.monotonic() - self._last_scan_time < SCAN_CACHE_TTL:
+            return list(self._last_scan_result)
         
-        # Scan USB/Serial devices
-        if SERIAL_AVAILABLE:
-            detected_machines.extend(self._scan_serial_devices())
+        detected_machines = []
         
-        # Scan Bluetooth devices
-        if BLUETOOTH_AVAILABLE:
-            detected_machines.extend(self._scan_bluetooth_devices())
+        # Both scans mostly wait on the OS, so Bluetooth discovery runs on a
+        # worker thread while the serial ports are scanned here
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # Scan Bluetooth devices
+            bluetooth_scan = executor.submit(self._scan_bluetooth_devices) if BLUETOOTH_AVAILABLE else None
+            
+            # Scan USB/Serial devices
+            if SERIAL_AVAILABLE:
+                detected_machines.extend(self._scan_serial_devices(use_cache=not force))
+            
+            if bluetooth_scan is not None:
+                detected_machines.extend(bluetooth_scan.result())
         
-        return detected_machines
+        self._last_scan_result = detected_machines
+        self._last_scan_time = time.monotonic()
+        return list(detected_machines)
     
-    def _scan_serial_devices(self) -> List[MachineInfo]:
+    def _scan_serial_devices(self, use_cache: bool = True) -> List[MachineInfo]:
         """
         Scan for USB/Serial connected machines.
         
+        Args:
+            use_cache: Reuse a port list younger than PORTS_CACHE_TTL seconds
+            
         Returns:
             List of detected serial machines
         """
         detected_machines = []
-        ports = serial.tools.list_ports.comports()
+        now = time.monotonic()
+        if use_cache and self._ports_cache and now - self._ports_cache[0] < PORTS_CACHE_TTL:
+            ports = self._ports_cache[1]
+        else:
+            ports = serial.tools.list_ports.comports()
+            self._ports_cache = (now, ports)
         
         for port in ports:
             machine_type = self._identify_machine_type(port)
@@ -162,27 +397,72 @@ class MachineController:
         
         return detected_machines
     
-    def _scan_bluetooth_devices(self) -> List[MachineInfo]:
+    def scan_devices_async(self, duration: float = 4.0) -> "queue.Queue[Optional[MachineInfo]]":
+        """
+        Scan for machines in a background thread.
+        
+        Machines are put on the returned queue as soon as they are found,
+        followed by None once the scan has finished.
+        
+        Args:
+            duration: Seconds to spend on Bluetooth discovery
+            
+        Returns:
+            Queue receiving MachineInfo objects and a final None
+        """
+        found: "queue.Queue[Optional[MachineInfo]]" = queue.Queue()
+        
+        def worker():
+            try:
+                if SERIAL_AVAILABLE:
+                    for machine in self._scan_serial_devices():
+                        found.put(machine)
+                if BLUETOOTH_AVAILABLE:
+                    self._scan_bluetooth_devices(duration, found)
+            finally:
+                found.put(None)
+        
+        threading.Thread(target=worker, daemon=True).start()
+        return found
+    
+    def _scan_bluetooth_devices(self, scan_duration: float = 8,
+                                found: Optional["queue.Queue"] = None) -> List[MachineInfo]:
         """
         Scan for Bluetooth laser engraving machines.
         
+        Args:
+            scan_duration: Seconds to spend on device discovery
+            found: Optional queue that receives each machine as it is found
+        
         Returns:
             List of detected Bluetooth machines
         """
         detected_machines = []
         
         try:
-            print("Scanning for Bluetooth devices... (this may take 10-15 seconds)")
-            # Discover nearby Bluetooth devices
-            nearby_devices = bluetooth.discover_devices(
-                duration=8,
-                lookup_names=True,
-                lookup_class=True
+            _log.info("Scanning for Bluetooth devices... (this may take %g+ seconds)", scan_duration)
+            # Discover addresses first and resolve names one at a time, so
+            # each machine can be reported as soon as its name is known
+            nearby_addresses = bluetooth.discover_devices(
+                duration=max(1, round(scan_duration)),
+                lookup_names=False
             )
             
-            for addr, name, device_class in nearby_devices:
+            cache = self._load_bt_cache()
+            cache_changed = False
+            for addr in nearby_addresses:
+                entry = cache.get(addr, {})
+                name = entry.get('name')
+                if name is None:
+                    name = bluetooth.lookup_name(addr, timeout=BT_NAME_LOOKUP_TIMEOUT)
+                    if name:
+                        # Non-engravers are cached too, so they are skipped quickly
+                        cache[addr] = entry
+                        entry['name'] = name
+                        entry['machine_type'] = self._identify_bluetooth_machine_type(name).value
+                        cache_changed = True
                 # Check if this looks like a laser engraver
-                if self._is_laser_engraver(name):
+                if name and self._is_laser_engraver(name):
                     machine_type = self._identify_bluetooth_machine_type(name)
                     
                     # Create machine info for Bluetooth device
@@ -199,15 +479,54 @@ class MachineController:
                     
                     detected_machines.append(machine)
                     self.machines[f"BT:{addr}"] = machine
-                    print(f"  Found Bluetooth device: {name} ({addr})")
+                    if found is not None:
+                        found.put(machine)
+                    _log.info("  Found Bluetooth device: %s (%s)", name, addr)
+            
+            if cache_changed:
+                self._save_bt_cache()
         
         except Exception as e:
-            print(f"Bluetooth scan error: {e}")
-            print("Note: Bluetooth may require admin/root privileges")
+            _log.error("Bluetooth scan error: %s", e)
+            _log.warning("Note: Bluetooth may require admin/root privileges")
         
         return detected_machines
     
-    def _is_laser_engraver(self, device_name: str) -> bool:
+    def _load_bt_cache(self) -> Dict[str, dict]:
+        """
+        Load the known Bluetooth devices from BT_CACHE_PATH.
+        
+        Returns:
+            Dictionary of Bluetooth address -> {'name', 'machine_type', 'channel'};
+            each key is present only once it is known
+        """
+        if self._bt_cache is None:
+            try:
+                with open(BT_CACHE_PATH, 'r', encoding='utf-8') as f:
+                    cache = json.load(f)
+                self._bt_cache = {
+                    addr: entry for addr, entry in cache.items() if isinstance(entry, dict)
+                }
+            except (OSError, ValueError, AttributeError):
+                self._bt_cache = {}
+        return self._bt_cache
+    
+    def _save_bt_cache(self):
+        """Write the known Bluetooth devices to BT_CACHE_PATH."""
+        try:
+            os.makedirs(os.path.dirname(BT_CACHE_PATH), exist_ok=True)
+            tmp_path = BT_CACHE_PATH + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._bt_cache or {}, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, BT_CACHE_PATH)
+        except OSError as e:
+            _log.warning("Could not save Bluetooth device cache: %s", e)
+    
+    # Nearby devices are seen again on every scan, so the name checks below
+    # are cached per name
+    @classmethod
+    @functools.lru_cache(maxsize=256)
+    def _is_laser_engraver(cls, device_name: str) -> bool:
         """
         Check if a Bluetooth device name suggests it's a laser engraver.
         
@@ -220,13 +539,11 @@ class MachineController:
         if not device_name:
             return False
         
-        name_lower = device_name.lower()
-        for keyword in self.BLUETOOTH_LASER_KEYWORDS:
-            if keyword in name_lower:
-                return True
-        return False
+        return cls._LASER_NAME_RE.search(device_name) is not None
     
-    def _identify_bluetooth_machine_type(self, device_name: str) -> MachineType:
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _identify_bluetooth_machine_type(device_name: str) -> MachineType:
         """
         Identify machine type from Bluetooth device name.
         
@@ -239,15 +556,12 @@ class MachineController:
         if not device_name:
             return MachineType.UNKNOWN
         
-        name_lower = device_name.lower()
-        
-        # Check for specific brands/types
-        if "neje" in name_lower or "xtool" in name_lower or "laserpecker" in name_lower:
-            return MachineType.GRBL  # Most desktop engravers use GRBL
-        elif "marlin" in name_lower:
-            return MachineType.MARLIN
-        elif "grbl" in name_lower or "cnc" in name_lower:
-            return MachineType.GRBL
+        # Check for specific brands/types; one scan finds all of them, and
+        # the keyword groups are then checked in priority order
+        found = {match.lastgroup for match in _BLUETOOTH_KEYWORDS_RE.finditer(device_name)}
+        for group, machine_type in _BLUETOOTH_KEYWORD_TYPES:
+            if group in found:
+                return machine_type
         
         return MachineType.UNKNOWN
     
@@ -262,22 +576,16 @@ class MachineController:
             MachineType enum
         """
         # Check against known devices
-        if port.vid and port.pid:
-            for device in self.KNOWN_DEVICES:
-                if port.vid == device["vid"] and port.pid == device["pid"]:
-                    return device["type"]
-        
-        # Check description for keywords
-        desc_lower = port.description.lower()
-        if "grbl" in desc_lower or "cnc" in desc_lower or "laser" in desc_lower:
-            return MachineType.GRBL
-        elif "marlin" in desc_lower:
-            return MachineType.MARLIN
-        elif "smoothie" in desc_lower:
-            return MachineType.SMOOTHIE
-        elif "ch340" in desc_lower or "ch341" in desc_lower:
-            # CH340/CH341 chips are commonly used with GRBL
-            return MachineType.GRBL
+        known_type = self._VIDPID_INDEX.get((port.vid, port.pid))
+        if known_type is not None:
+            return known_type
+        
+        # Check description for keywords; one scan finds all of them, and
+        # the keyword groups are then checked in priority order
+        found = {match.lastgroup for match in _PORT_KEYWORDS_RE.finditer(port.description)}
+        for group, machine_type in _PORT_KEYWORD_TYPES:
+            if group in found:
+                return machine_type
         
         return MachineType.UNKNOWN
     
@@ -309,7 +617,7 @@ class MachineController:
                 return self._connect_serial(port, baudrate)
                 
         except Exception as e:
-            print(f"Error connecting to {port}: {e}")
+            _log.error("Error connecting to %s: %s", port, e)
             return False
     
     def _connect_serial(self, port: str, baudrate: int) -> bool:
@@ -324,7 +632,7 @@ class MachineController:
             True if connection successful
         """
         if not SERIAL_AVAILABLE:
-            print("Error: pyserial not installed")
+            _log.error("Error: pyserial not installed")
             return False
         
         # Open serial connection
@@ -336,7 +644,23 @@ class MachineController:
         )
         
         self.active_port = port
+        self._set_low_latency(port)
+        
+        # Everything the machine sends is read as it arrives; status reports
+        # update the machine right away instead of waiting to be read
+        self._replies = queue.Queue()
+        replies = self._replies
+        on_status = lambda line: self._apply_status_report(port, line)
+        self._reader = serial.threaded.ReaderThread(
+            self.active_connection,
+            lambda: _GrblLineReader(replies, on_status, lambda: self._on_machine_reset(replies))
+        )
+        self._reader.start()
+        self._reader.connect()
+        
         time.sleep(2)  # Wait for connection to stabilize
+        # Drop anything the controller printed while starting up
+        self._drain_replies(replies)
         
         # Update machine status
         if port in self.machines:
@@ -346,9 +670,38 @@ class MachineController:
         # Start monitoring thread
         self._start_monitoring()
         
-        print(f"Connected to {port} at {baudrate} baud")
+        _log.info("Connected to %s at %d baud", port, baudrate)
         return True
     
+    def _set_low_latency(self, port: str):
+        """
+        Ask a Linux USB-serial adapter to pass on received bytes right away.
+        
+        FTDI adapters hold received bytes for up to 16 ms by default, which
+        is added to every reply the machine sends. Ports, platforms or
+        drivers that do not support this are left as they are.
+        
+        Args:
+            port: Serial port path
+        """
+        if not sys.platform.startswith('linux'):
+            return
+        
+        # FTDI driver: /sys/bus/usb-serial/devices/ttyUSB0/latency_timer
+        latency_path = os.path.join('/sys/bus/usb-serial/devices',
+                                    os.path.basename(os.path.realpath(port)), 'latency_timer')
+        try:
+            with open(latency_path, 'w') as f:
+                f.write('1')
+        except OSError:
+            pass  # Not FTDI, or no write permission
+        
+        # Same request through the tty layer (setserial low_latency)
+        try:
+            self.active_connection.set_low_latency_mode(True)
+        except (AttributeError, ValueError, OSError, IOError):
+            pass
+    
     def _connect_bluetooth(self, port: str) -> bool:
         """
         Connect to a Bluetooth machine.
@@ -360,7 +713,7 @@ class MachineController:
             True if connection successful
         """
         if not BLUETOOTH_AVAILABLE:
-            print("Error: pybluez not installed")
+            _log.error("Error: pybluez not installed")
             return False
         
         # Extract Bluetooth address from port identifier
@@ -368,24 +721,36 @@ class MachineController:
         
         try:
             # Create Bluetooth socket using RFCOMM (Serial Port Profile)
-            print(f"Connecting to Bluetooth device {bt_address}...")
+            _log.info("Connecting to Bluetooth device %s...", bt_address)
             sock = bluetooth.BluetoothSocket(bluetooth.RFCOMM)
             
-            # Find the SPP service (Serial Port Profile)
-            # Most laser engravers use channel 1, but we'll try to discover
-            services = bluetooth.find_service(address=bt_address)
-            
-            channel = 1  # Default channel
-            if services:
-                for service in services:
-                    if "serial" in service.get("name", "").lower():
-                        channel = service["port"]
-                        break
+            # Reuse the channel of the last successful connection if known
+            cache = self._load_bt_cache()
+            entry = cache.get(bt_address, {})
+            cached_channel = entry.get('channel')
+            channel = cached_channel if cached_channel is not None else self._find_rfcomm_channel(bt_address)
             
             # Connect to the device
-            sock.connect((bt_address, channel))
+            try:
+                sock.connect((bt_address, channel))
+            except Exception:
+                if cached_channel is None:
+                    raise
+                # The device may have moved its serial service; ask it again
+                del entry['channel']
+                cached_channel = None
+                self._save_bt_cache()
+                sock.close()
+                sock = bluetooth.BluetoothSocket(bluetooth.RFCOMM)
+                channel = self._find_rfcomm_channel(bt_address)
+                sock.connect((bt_address, channel))
             sock.settimeout(2.0)
             
+            if channel != cached_channel:
+                cache[bt_address] = entry
+                entry['channel'] = channel
+                self._save_bt_cache()
+            
             self.active_bluetooth_socket = sock
             self.active_port = port
             
@@ -397,11 +762,11 @@ class MachineController:
             # Start monitoring thread
             self._start_monitoring()
             
-            print(f"Connected to Bluetooth device {bt_address}")
+            _log.info("Connected to Bluetooth device %s", bt_address)
             return True
             
         except Exception as e:
-            print(f"Bluetooth connection error: {e}")
+            _log.error("Bluetooth connection error: %s", e)
             if self.active_bluetooth_socket:
                 try:
                     self.active_bluetooth_socket.close()
@@ -410,11 +775,39 @@ class MachineController:
                 self.active_bluetooth_socket = None
             return False
     
+    def _find_rfcomm_channel(self, bt_address: str) -> int:
+        """
+        Ask a Bluetooth device which RFCOMM channel its serial port uses.
+        
+        Args:
+            bt_address: Bluetooth address of the device
+            
+        Returns:
+            The channel of the SPP service (Serial Port Profile), or 1
+        """
+        # Most laser engravers use channel 1, but we'll try to discover
+        services = bluetooth.find_service(address=bt_address)
+        
+        if services:
+            for service in services:
+                if "serial" in service.get("name", "").lower():
+                    return service["port"]
+        
+        return 1  # Default channel
+    
     def disconnect(self):
         """Disconnect from the active machine."""
+        self._end_stream()
         self._stop_monitoring()
+        self._last_scan_time = float('-inf')
         
         # Close serial connection
+        if self._reader is not None:
+            try:
+                self._reader.close()  # Stops reading, then closes the port
+            except Exception:
+                pass
+            self._reader = None
         if self.active_connection and self.active_connection.is_open:
             try:
                 self.active_connection.close()
@@ -450,6 +843,24 @@ class MachineController:
         if not self.active_connection and not self.active_bluetooth_socket:
             return None
         
+        # Realtime commands (status, pause, resume, reset) are single bytes
+        # GRBL acts on as soon as they arrive and never answers with ok, so
+        # on serial they are written as-is, without a newline or a wait for
+        # a reply; this also works while a file is streaming
+        if command in _REALTIME_COMMANDS and self._reader is not None:
+            try:
+                self._reader.write(command.encode('latin-1'))
+                return "ok"
+            except Exception as e:
+                _log.error("Error sending command: %s", e)
+                return None
+        
+        # While a file is streaming its reader owns the responses; a line
+        # command would take the file's ok
+        if self._streaming:
+            _log.error("Error: cannot send commands while a G-code file is streaming")
+            return None
+        
         try:
             # Ensure command ends with newline
             if not command.endswith('\n'):
@@ -458,8 +869,9 @@ class MachineController:
             # Send via appropriate connection type
             if self.active_connection and self.active_connection.is_open:
                 # Serial connection
-                self.active_connection.write(command.encode())
-                response = self.active_connection.readline().decode().strip()
+                with self._serial_lock:
+                    self._reader.write(command.encode())
+                    response = self._read_command_reply()
                 return response
                 
             elif self.active_bluetooth_socket:
@@ -477,12 +889,16 @@ class MachineController:
             return None
             
         except Exception as e:
-            print(f"Error sending command: {e}")
+            _log.error("Error sending command: %s", e)
             return None
     
     def send_gcode_file(self, filepath: str, progress_callback=None) -> bool:
         """
-        Send a G-code file to the machine line by line.
+        Send a G-code file to the machine.
+        
+        Serial connections are streamed with GRBL's character-counting
+        protocol (see _stream_serial); Bluetooth connections send one line
+        and wait for its reply before the next.
         
         Args:
             filepath: Path to G-code file
@@ -495,36 +911,169 @@ class MachineController:
             return False
         
         try:
-            with open(filepath, 'r') as f:
-                lines = f.readlines()
+            with _open_gcode_file(filepath) as data:
+                lines = _iter_gcode_lines(data)
+                try:
+                    if self.active_connection and self.active_connection.is_open:
+                        return self._stream_serial(lines, len(data), progress_callback)
+                    
+                    for line_number, end, line in lines:
+                        # Send line
+                        response = self.send_command(line.decode())
+                        
+                        # Check for error
+                        if response and 'error' in response.lower():
+                            _log.error("Error on line %d: %s", line_number, response)
+                            return False
+                        
+                        # Update progress
+                        if progress_callback:
+                            progress_callback(int(end / len(data) * 100))
+                    
+                    return True
+                finally:
+                    lines.close()  # Releases the file mapping
             
-            total_lines = len(lines)
+        except Exception as e:
+            _log.error("Error sending G-code file: %s", e)
+            return False
+    
+    def _stream_serial(self, lines: Iterator[Tuple[int, int, bytes]], total_bytes: int,
+                       progress_callback=None) -> bool:
+        """
+        Stream G-code lines over serial with character counting.
+        
+        Lines are written as long as the bytes not yet acknowledged fit in
+        GRBL's receive buffer, and every ok/error reply frees the bytes of
+        the oldest line. The controller always has the next lines queued
+        instead of idling through a round trip per line.
+        
+        Args:
+            lines: (line number, end offset, line bytes) from _iter_gcode_lines
+            total_bytes: Size of the file, for progress
+            progress_callback: Optional function to call with progress (0-100)
             
-            for i, line in enumerate(lines):
-                line = line.strip()
-                
-                # Skip empty lines and comments
-                if not line or line.startswith(';') or line.startswith('('):
-                    continue
-                
-                # Send line
-                response = self.send_command(line)
+        Returns:
+            True if every line was accepted
+        """
+        write = self._reader.write
+        in_flight = deque()  # (line number, end offset, byte count) awaiting a reply
+        buffered = 0
+        
+        self._serial_lock.acquire()
+        # Replies that arrived after an earlier command stopped waiting
+        # (a slow $H, say) would otherwise acknowledge the first lines
+        self._drain_replies(self._replies)
+        self._abort_stream.clear()
+        self._streaming = True
+        if self.active_port in self.machines:
+            self.machines[self.active_port].status = MachineStatus.RUNNING
+        try:
+            for line_number, end, data in lines:
+                # Wait for replies until the line fits in the receive buffer
+                while in_flight and buffered + len(data) > GRBL_RX_BUFFER_SIZE:
+                    acked = self._await_stream_reply(in_flight)
+                    if acked is None:
+                        return False
+                    buffered -= acked[2]
+                    if progress_callback:
+                        progress_callback(int(acked[1] / total_bytes * 100))
                 
-                # Check for error
-                if response and 'error' in response.lower():
-                    print(f"Error on line {i}: {response}")
+                write(data)
+                in_flight.append((line_number, end, len(data)))
+                buffered += len(data)
+            
+            # Wait for the remaining lines to be accepted
+            while in_flight:
+                acked = self._await_stream_reply(in_flight)
+                if acked is None:
                     return False
-                
-                # Update progress
-                if progress_callback:
-                    progress = int((i + 1) / total_lines * 100)
-                    progress_callback(progress)
             
+            if progress_callback:
+                progress_callback(100)
             return True
+        finally:
+            self._streaming = False
+            if in_flight or self._abort_stream.is_set():
+                # Ended part way; replies still queued belong to lines that
+                # were rejected or that the machine has thrown away
+                in_flight.clear()
+                self._drain_replies(self._replies)
+            self._serial_lock.release()
+    
+    def _await_stream_reply(self, in_flight: deque) -> Optional[Tuple[int, int, int]]:
+        """
+        Read replies until the oldest streamed line is acknowledged.
+        
+        Args:
+            in_flight: Queue of (line number, end offset, byte count) awaiting a reply
             
-        except Exception as e:
-            print(f"Error sending G-code file: {e}")
-            return False
+        Returns:
+            The acknowledged (line number, end offset, byte count), or None if the
+            controller reported an error or alarm, the stream was stopped, the
+            connection closed or the machine went silent
+        """
+        while True:
+            if self._abort_stream.is_set():
+                _log.error("Streaming stopped with %d lines unconfirmed", len(in_flight))
+                return None
+            reader = self._reader
+            if reader is None or not reader.alive:
+                _log.error("Connection closed while streaming")
+                return None
+            
+            response = self._read_reply()
+            
+            if response == b'ok':
+                return in_flight.popleft()
+            if response.startswith(b'error'):
+                line_number = in_flight.popleft()[0]
+                _log.error("Error on line %d: %s", line_number, response.decode())
+                return None
+            if response.startswith(b'ALARM'):
+                _log.error("Machine alarm while streaming: %s", response.decode())
+                return None
+            if not response and time.monotonic() - reader.protocol.last_heard > STREAM_STALL_TIMEOUT:
+                _log.error("Machine stopped responding while streaming")
+                return None
+            # Anything else (timeouts while the planner is full, messages)
+            # does not acknowledge a line
+    
+    def _read_reply(self) -> bytes:
+        """
+        Wait for the next reply line from the serial port.
+        
+        Callers hold _serial_lock.
+        
+        Returns:
+            The line without surrounding whitespace, or b'' if no reply
+            arrived within REPLY_TIMEOUT
+        """
+        try:
+            return self._replies.get(timeout=REPLY_TIMEOUT)
+        except queue.Empty:
+            return b''
+    
+    def _read_command_reply(self) -> str:
+        """
+        Read the reply to a line command.
+        
+        Commands such as $$ or $# answer with several lines before their
+        ok, so lines are collected until ok, error or ALARM, or until
+        nothing arrives within REPLY_TIMEOUT. Callers hold _serial_lock.
+        
+        Returns:
+            The reply lines joined with newlines
+        """
+        response = []
+        while True:
+            line = self._read_reply()
+            if not line:
+                break
+            response.append(line.decode(errors='replace'))
+            if line == b'ok' or line.startswith((b'error', b'ALARM')):
+                break
+        return '\n'.join(response)
     
     def get_status(self) -> Optional[MachineStatus]:
         """
@@ -540,7 +1089,7 @@ class MachineController:
     
     def home(self) -> bool:
         """Send homing command to machine."""
-        if self.active_port:
+        if self.active_port in self.machines:
             self.machines[self.active_port].status = MachineStatus.HOMING
         
         response = self.send_command("$H")  # GRBL homing command
@@ -548,7 +1097,7 @@ class MachineController:
     
     def pause(self) -> bool:
         """Pause the current job."""
-        if self.active_port:
+        if self.active_port in self.machines:
             self.machines[self.active_port].status = MachineStatus.PAUSED
         
         response = self.send_command("!")  # GRBL pause (feed hold)
@@ -556,7 +1105,7 @@ class MachineController:
     
     def resume(self) -> bool:
         """Resume paused job."""
-        if self.active_port:
+        if self.active_port in self.machines:
             self.machines[self.active_port].status = MachineStatus.RUNNING
         
         response = self.send_command("~")  # GRBL resume (cycle start)
@@ -564,60 +1113,145 @@ class MachineController:
     
     def stop(self) -> bool:
         """Stop the current job (soft reset)."""
-        if self.active_port:
+        if self.active_port in self.machines:
             self.machines[self.active_port].status = MachineStatus.IDLE
         
+        self._end_stream()
         response = self.send_command("\x18")  # GRBL soft reset (Ctrl-X)
         return response is not None
     
     def emergency_stop(self) -> bool:
         """Emergency stop (resets machine)."""
-        if self.active_port:
+        if self.active_port in self.machines:
             self.machines[self.active_port].status = MachineStatus.ALARM
         
+        self._end_stream()
         response = self.send_command("\x18")  # GRBL reset
         return response is not None
     
+    def _end_stream(self):
+        """End a file being streamed, if any; its send returns False."""
+        self._abort_stream.set()
+        if self._streaming:
+            self._replies.put(b'')  # Wake the streamer from its wait for a reply
+    
+    def _on_machine_reset(self, replies: queue.Queue):
+        """
+        Handle the banner GRBL prints after a reset.
+        
+        The reset emptied the machine's receive buffer, so lines still
+        waiting for a reply will never get one.
+        
+        Args:
+            replies: Reply queue of the connection that was reset
+        """
+        self._drain_replies(replies)
+        self._end_stream()
+    
+    @staticmethod
+    def _drain_replies(replies: queue.Queue):
+        """Drop replies nobody will read."""
+        while True:
+            try:
+                replies.get_nowait()
+            except queue.Empty:
+                return
+    
     def _start_monitoring(self):
         """Start background thread to monitor machine status."""
         if self.monitoring_thread and self.monitoring_thread.is_alive():
             return
         
-        self.should_monitor = True
+        self._stop_monitor.clear()
         self.monitoring_thread = threading.Thread(target=self._monitor_loop, daemon=True)
         self.monitoring_thread.start()
     
     def _stop_monitoring(self):
         """Stop monitoring thread."""
-        self.should_monitor = False
+        self._stop_monitor.set()  # Also wakes the thread from its wait
         if self.monitoring_thread:
             self.monitoring_thread.join(timeout=2)
     
     def _monitor_loop(self):
         """Background loop to monitor machine status."""
-        while self.should_monitor and self.active_connection:
+        conn = self.active_connection
+        reader = self._reader
+        stop = self._stop_monitor
+        
+        while conn is not None and self.active_connection is conn:
             try:
-                # Send status query (GRBL style)
-                if self.active_connection.is_open:
-                    self.active_connection.write(b'?')
-                    
-                    # Read response
-                    response = self.active_connection.readline().decode().strip()
-                    
-                    if response and self.active_port in self.machines:
-                        # Parse status from response
-                        # Example GRBL response: <Idle|MPos:0.000,0.000,0.000|FS:0,0>
-                        if 'Idle' in response:
-                            self.machines[self.active_port].status = MachineStatus.IDLE
-                        elif 'Run' in response:
-                            self.machines[self.active_port].status = MachineStatus.RUNNING
-                        elif 'Alarm' in response:
-                            self.machines[self.active_port].status = MachineStatus.ALARM
-                
-                time.sleep(1)  # Query every second
-                
+                # Request a status report (GRBL style). It is a realtime
+                # command, so it is safe in the middle of a streamed file;
+                # the reader applies the report when it arrives
+                reader.write(b'?')
             except Exception:
-                time.sleep(1)  # Wait before retry
+                pass  # Closed port; retried on the next tick
+            
+            if stop.wait(STATUS_POLL_INTERVAL):
+                break
+    
+    def _apply_status_report(self, port: str, line: bytes):
+        """
+        Update a machine from a GRBL status report.
+        
+        Args:
+            port: Port of the machine that sent the report
+            line: Report line, e.g. b'<Idle|MPos:0.000,0.000,0.000|FS:0,0>'
+        """
+        report = _GRBL_STATUS_RE.match(line)
+        machine = self.machines.get(port)
+        if report and machine is not None:
+            status = _GRBL_STATES.get(report['state'])
+            if status is not None:
+                machine.status = status
+            if report['x'] is not None:
+                machine.position = tuple(
+                    float(axis) for axis in report.group('x', 'y', 'z') if axis is not None
+                )
+            if report['feed'] is not None:
+                machine.feed_rate = float(report['feed'])
+
+
+@contextlib.contextmanager
+def _open_gcode_file(filepath: str):
+    """
+    Map a G-code file into memory for reading.
+    
+    Args:
+        filepath: Path to G-code file
+        
+    Yields:
+        The file contents as a read-only mmap (bytes for an empty file,
+        which cannot be mapped)
+    """
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+def _iter_gcode_lines(data) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    Yield the G-code lines to send.
+    
+    A single regex scan over the file finds the lines to send, so blank
+    lines and comments are skipped without creating any objects for them.
+    
+    Args:
+        data: File contents (bytes or mmap)
+        
+    Yields:
+        (line number, offset of the end of the line, newline-terminated line bytes)
+    """
+    line_number = 1
+    pos = 0
+    for match in _GCODE_LINE_RE.finditer(data):
+        start = match.start()
+        line_number += data[pos:start].count(b'\n')
+        pos = start
+        yield line_number, match.end(), match.group(1) + b'\n'
 
 
 # Global controller instance
@@ -2,6 +2,8 @@
 
 // Constants
 const TOUCH_DEBOUNCE_MS = 100; // Delay to prevent double-triggering from touch-to-click events
+const CONVERT_POLL_MS = 500; // How often to ask whether a background conversion has finished
+const SEND_POLL_MS = 1000; // How often to check on G-code being sent to the machine
 
 let uploadedFile = null;
 let uploadedFilename = null;
@@ -172,25 +174,43 @@ async function convertFile() {
     }
 }
 
+// Start a conversion in the background and wait for its result, so the
+// server is not held up by one long request
+async function requestConversion(url, payload) {
+    const response = await fetch(url, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({ ...payload, async: true })
+    });
+    
+    let data = await response.json();
+    if (!data.job_id) {
+        return data;
+    }
+    
+    const jobId = data.job_id;
+    do {
+        await new Promise(resolve => setTimeout(resolve, CONVERT_POLL_MS));
+        const status = await fetch('/api/convert/status/' + jobId);
+        data = await status.json();
+    } while (data.status === 'running');
+    
+    return data;
+}
+
 async function convertFileMultiFormat(useCase) {
     // Show loading
     showLoading('Generating all formats...');
     document.getElementById('convertBtn').disabled = true;
     
     try {
-        const response = await fetch('/api/convert-multi', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                filename: uploadedFilename,
-                use_case: useCase
-            })
+        const data = await requestConversion('/api/convert-multi', {
+            filename: uploadedFilename,
+            use_case: useCase
         });
         
-        const data = await response.json();
-        
         if (data.error) {
             showAlert(data.error, 'error');
             hideLoading();
@@ -272,22 +292,14 @@ async function convertFileSingleFormat() {
     document.getElementById('convertBtn').disabled = true;
     
     try {
-        const response = await fetch('/api/convert', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                filename: uploadedFilename,
-                output_type: outputType,
-                dpi: dpi,
-                threshold: threshold,
-                use_case: useCase
-            })
+        const data = await requestConversion('/api/convert', {
+            filename: uploadedFilename,
+            output_type: outputType,
+            dpi: dpi,
+            threshold: threshold,
+            use_case: useCase
         });
         
-        const data = await response.json();
-        
         if (data.error) {
             showAlert(data.error, 'error');
             hideLoading();
@@ -591,8 +603,10 @@ async function sendToMachine() {
         hideLoading();
         
         if (data.success) {
-            showAlert('G-code sent to machine! Engraving started.', 'success');
+            // The server sends in the background; controls work meanwhile
+            showAlert('Engraving started. G-code is being sent to the machine.', 'success');
             document.getElementById('controlButtons').style.display = 'block';
+            watchGcodeSend(data.job_id);
         } else {
             showAlert('Failed to send: ' + data.error, 'error');
         }
@@ -602,6 +616,30 @@ async function sendToMachine() {
     }
 }
 
+// Report when a background G-code send finishes; the Stop button or a
+// disconnect ends it early
+async function watchGcodeSend(jobId) {
+    let data;
+    try {
+        do {
+            await new Promise(resolve => setTimeout(resolve, SEND_POLL_MS));
+            const status = await fetch('/api/machines/send-status/' + jobId);
+            data = await status.json();
+        } while (data.status === 'running');
+    } catch (error) {
+        showAlert('Lost track of the G-code send: ' + error.message, 'warning');
+        return;
+    }
+    
+    if (data.success) {
+        showAlert('G-code sent to machine successfully', 'success');
+    } else if (data.error === 'Cancelled') {
+        showAlert('G-code send cancelled', 'warning');
+    } else {
+        showAlert('Failed to send: ' + data.error, 'error');
+    }
+}
+
 async function controlMachine(action) {
     showLoading(`Executing ${action}...`);
     
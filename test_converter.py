@@ -2,167 +2,177 @@
 """
 Simple validation test for laser_converter.py
 Tests basic functionality without external dependencies
+
+Run with: python -m pytest test_converter.py (add -n auto with pytest-xdist)
 """
 
 import sys
 import os
+import io
+import re
+import tempfile
+from contextlib import redirect_stdout
+
+import pytest
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import laser_converter
+
+
+USE_CASES = ['signage', 'jewelry', 'personalization', 'photos', 'general', 'industrial', 'arts']
+
+# Suggestions should mention materials OR indicate not recommended
+MATERIAL_KEYWORDS = ['wood', 'acrylic', 'metal', 'leather', 'slate', 'aluminum',
+                     'bamboo', 'ceramic', 'mdf', 'plywood', 'not recommended', 'not ideal']
+
+# All keywords in one case-insensitive pattern, matched in a single scan;
+# keywords may appear inside longer words ("hardwood")
+MATERIAL_KEYWORDS_RE = re.compile('|'.join(map(re.escape, MATERIAL_KEYWORDS)), re.IGNORECASE)
+
+
+@pytest.fixture(scope="session")
+def material_suggestions():
+    """The material suggestion table, shared by every test in the run"""
+    return laser_converter.MATERIAL_SUGGESTIONS
+
+
 def test_imports():
     """Test that all imports work"""
-    print("Testing imports...", end=" ")
-    try:
-        import laser_converter
-        print("✓")
-        return True
-    except ImportError as e:
-        print(f"✗ Failed: {e}")
-        return False
-
-def test_detect_file_type():
+    assert laser_converter.detect_file_type
+    assert laser_converter.suggest_material
+
+
+@pytest.mark.parametrize("filename,expected", [
+    # Vector files
+    ("test.svg", "vector"),
+    ("test.dxf", "vector"),
+    ("test.ai", "vector"),
+    ("test.eps", "vector"),
+    # Raster files
+    ("test.png", "raster"),
+    ("test.jpg", "raster"),
+    ("test.jpeg", "raster"),
+    ("test.bmp", "raster"),
+    ("test.tiff", "raster"),
+    ("test.tif", "raster"),
+])
+def test_detect_file_type(filename, expected):
     """Test file type detection"""
-    print("Testing file type detection...", end=" ")
-    try:
-        from laser_converter import detect_file_type
-        
-        # Test vector files
-        assert detect_file_type("test.svg") == "vector"
-        assert detect_file_type("test.dxf") == "vector"
-        assert detect_file_type("test.ai") == "vector"
-        assert detect_file_type("test.eps") == "vector"
-        
-        # Test raster files
-        assert detect_file_type("test.png") == "raster"
-        assert detect_file_type("test.jpg") == "raster"
-        assert detect_file_type("test.jpeg") == "raster"
-        assert detect_file_type("test.bmp") == "raster"
-        assert detect_file_type("test.tiff") == "raster"
-        assert detect_file_type("test.tif") == "raster"
-        
-        # Test unsupported file
-        try:
-            detect_file_type("test.txt")
-            print("✗ Should have raised ValueError")
-            return False
-        except ValueError:
-            pass
-        
-        print("✓")
-        return True
-    except AssertionError as e:
-        print(f"✗ Failed: {e}")
-        return False
-    except Exception as e:
-        print(f"✗ Unexpected error: {e}")
-        return False
-
-def test_material_suggestions():
+    assert laser_converter.detect_file_type(filename) == expected
+
+
+def test_detect_file_type_unsupported():
+    """Test that unsupported files are rejected"""
+    with pytest.raises(ValueError):
+        laser_converter.detect_file_type("test.txt")
+
+
+@pytest.mark.parametrize("output_path,use_case,any_of", [
+    ("output.svg", "signage", ["Acrylic", "plywood"]),
+    ("output.png", "photos", ["Wood", "slate", "ceramic"]),
+    # Default case
+    ("output.xyz", "unknown", ["General suggestion"]),
+])
+def test_material_suggestions(output_path, use_case, any_of):
     """Test material suggestion system"""
-    print("Testing material suggestions...", end=" ")
-    try:
-        from laser_converter import suggest_material, MATERIAL_SUGGESTIONS
-        
-        # Test known combinations
-        result = suggest_material("output.svg", "signage")
-        assert "Acrylic" in result or "plywood" in result
-        
-        result = suggest_material("output.png", "photos")
-        assert "Wood" in result or "slate" in result or "ceramic" in result
-        
-        # Test default case
-        result = suggest_material("output.xyz", "unknown")
-        assert "General suggestion" in result
-        
-        # Verify all use cases exist and have meaningful content
-        use_cases = ['signage', 'jewelry', 'personalization', 'photos', 'general', 'industrial', 'arts']
-        for use_case in use_cases:
-            assert use_case in MATERIAL_SUGGESTIONS['svg']
-            assert use_case in MATERIAL_SUGGESTIONS['png']
-            
-            # Verify suggestions are non-empty and meaningful
-            svg_suggestion = MATERIAL_SUGGESTIONS['svg'][use_case]
-            png_suggestion = MATERIAL_SUGGESTIONS['png'][use_case]
-            
-            assert len(svg_suggestion) > 10, f"SVG suggestion for {use_case} too short"
-            assert len(png_suggestion) > 10, f"PNG suggestion for {use_case} too short"
-            
-            # Check for relevant keywords (material names or "Not recommended" for inappropriate uses)
-            if use_case != 'general':
-                # Suggestions should mention materials OR indicate not recommended
-                material_keywords = ['wood', 'acrylic', 'metal', 'leather', 'slate', 'aluminum', 
-                                   'bamboo', 'ceramic', 'mdf', 'plywood', 'not recommended', 'not ideal']
-                assert any(keyword in svg_suggestion.lower() for keyword in material_keywords), \
-                    f"SVG suggestion for {use_case} missing material keywords: {svg_suggestion}"
-                assert any(keyword in png_suggestion.lower() for keyword in material_keywords), \
-                    f"PNG suggestion for {use_case} missing material keywords: {png_suggestion}"
-        
-        print("✓")
-        return True
-    except AssertionError as e:
-        print(f"✗ Failed: {e}")
-        return False
-    except Exception as e:
-        print(f"✗ Unexpected error: {e}")
-        return False
+    result = laser_converter.suggest_material(output_path, use_case)
+    assert any(text in result for text in any_of), result
+
+
+@pytest.mark.parametrize("ext", ["svg", "png"])
+@pytest.mark.parametrize("use_case", USE_CASES)
+def test_material_suggestion_content(material_suggestions, ext, use_case):
+    """Verify all use cases exist and have meaningful content"""
+    assert use_case in material_suggestions[ext]
+    
+    suggestion = material_suggestions[ext][use_case]
+    assert len(suggestion) > 10, f"{ext.upper()} suggestion for {use_case} too short"
+    
+    # Check for relevant keywords (material names or "Not recommended" for inappropriate uses)
+    if use_case != 'general':
+        assert MATERIAL_KEYWORDS_RE.search(suggestion), \
+            f"{ext.upper()} suggestion for {use_case} missing material keywords: {suggestion}"
+
 
 def test_best_practices():
     """Test best practices display"""
-    print("Testing best practices...", end=" ")
-    try:
-        from laser_converter import print_best_practices
-        import io
-        from contextlib import redirect_stdout
-        
-        # Capture output
-        f = io.StringIO()
-        with redirect_stdout(f):
-            print_best_practices()
-        
-        output = f.getvalue()
-        
-        # Check for key phrases
-        assert "BEST PRACTICES" in output
-        assert "DPI" in output or "Resolution" in output
-        assert "test" in output.lower()
-        assert "material" in output.lower()
-        
-        print("✓")
-        return True
-    except Exception as e:
-        print(f"✗ Unexpected error: {e}")
-        return False
-
-def main():
-    """Run all tests"""
-    print("="*60)
-    print("Laser Converter Validation Tests")
-    print("="*60)
+    # Capture output
+    f = io.StringIO()
+    with redirect_stdout(f):
+        laser_converter.print_best_practices()
     
-    tests = [
-        test_imports,
-        test_detect_file_type,
-        test_material_suggestions,
-        test_best_practices,
-    ]
+    output = f.getvalue()
     
-    results = []
-    for test in tests:
-        results.append(test())
+    # Check for key phrases
+    assert "BEST PRACTICES" in output
+    assert "DPI" in output or "Resolution" in output
+    assert "test" in output.lower()
+    assert "material" in output.lower()
+
+
+def test_raster_tracing():
+    """Test that traced rectangles cover exactly the dark pixels"""
+    Image = pytest.importorskip("PIL.Image")
+    ImageDraw = pytest.importorskip("PIL.ImageDraw")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        png_path = os.path.join(tmp, "shape.png")
+        img = Image.new("L", (40, 30), 255)
+        draw = ImageDraw.Draw(img)
+        draw.ellipse((5, 5, 35, 25), fill=0)
+        draw.rectangle((0, 0, 3, 29), fill=0)
+        img.save(png_path)
+        
+        # Rectangle output is pixel-exact, Potrace outlines are not
+        with open(laser_converter.raster_to_svg(png_path, use_potrace=False), encoding="utf-8") as f:
+            svg = f.read()
     
-    print("="*60)
-    passed = sum(results)
-    total = len(results)
+    covered = set()
+    for x, y, w, h in re.findall(r'<rect x="(\d+)" y="(\d+)" width="(\d+)" height="(\d+)"', svg):
+        x, y, w, h = int(x), int(y), int(w), int(h)
+        cells = {(cx, cy) for cx in range(x, x + w) for cy in range(y, y + h)}
+        assert not covered & cells, "Rectangles overlap"
+        covered |= cells
     
-    if passed == total:
-        print(f"✓ All {total} tests passed!")
-        print("="*60)
-        return 0
-    else:
-        print(f"✗ {passed}/{total} tests passed")
-        print("="*60)
-        return 1
+    pixels = img.load()
+    dark = {(x, y) for x in range(40) for y in range(30) if pixels[x, y] < 128}
+    assert covered == dark, "Traced rectangles do not match dark pixels"
+
+
+def test_multi_format_shares_worker_pool(monkeypatch):
+    """Concurrent multi-format runs succeed and reuse one pool of worker processes"""
+    Image = pytest.importorskip("PIL.Image")
+    import threading
+    import converter_core
+    
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)  # Use the pool even on one core
+    monkeypatch.setattr(converter_core, "_multi_format_pool", None)
+    with tempfile.TemporaryDirectory() as tmp:
+        inputs = []
+        for i in range(2):
+            path = os.path.join(tmp, f"art{i}.png")
+            Image.new("L", (20, 20), 255 if i else 0).save(path)
+            inputs.append(path)
+        
+        results = {}
+        threads = [threading.Thread(target=lambda p=p: results.__setitem__(
+            p, converter_core.convert_file_multi_format(p, verbose=False))) for p in inputs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        pool = converter_core._multi_format_pool
+        
+        again = converter_core.convert_file_multi_format(inputs[0], verbose=False)
+        
+        for result in [*results.values(), again]:
+            assert result['success'], result['error']
+            assert set(result['outputs']) == set(converter_core.MULTI_FORMAT_INFO)
+        assert pool is not None and converter_core._multi_format_pool is pool
+        pool.shutdown()
+
 
 if __name__ == "__main__":
-    sys.exit(main())
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Tests for gcode_generator.py
+
+Run with: python -m pytest test_gcode_generator.py
+"""
+
+import math
+import os
+import re
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import gcode_generator
+
+
+def load_with_pil(monkeypatch, path):
+    """_load_grayscale as it runs without OpenCV installed"""
+    def missing(name):
+        raise ImportError(name)
+    
+    with monkeypatch.context() as patch:
+        patch.setattr(gcode_generator, "_optional_module", missing)
+        return gcode_generator._load_grayscale(path)
+
+
+@pytest.mark.parametrize("mode, tolerance", [("L", 0), ("RGB", 1)])
+def test_load_grayscale_decoders_agree(tmp_path, monkeypatch, mode, tolerance):
+    """OpenCV and PIL give the same array (colour conversions may round one level apart)"""
+    pytest.importorskip("cv2")
+    rng = np.random.default_rng(0)
+    shape = (12, 20) if mode == "L" else (12, 20, 3)
+    path = str(tmp_path / f"{mode}.png")
+    Image.fromarray(rng.integers(0, 256, shape, dtype=np.uint8), mode).save(path)
+    
+    with_cv2 = gcode_generator._load_grayscale(path)
+    with_pil = load_with_pil(monkeypatch, path)
+    assert with_cv2.dtype == with_pil.dtype == np.uint8
+    assert with_cv2.shape == with_pil.shape
+    assert np.abs(with_cv2.astype(int) - with_pil.astype(int)).max() <= tolerance
+
+
+def test_load_grayscale_ignores_exif_orientation(tmp_path, monkeypatch):
+    """An EXIF rotation tag does not turn the OpenCV result sideways"""
+    pytest.importorskip("cv2")
+    path = str(tmp_path / "rotated.jpg")
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+    Image.new("L", (20, 12), 128).save(path, exif=exif)
+    
+    assert gcode_generator._load_grayscale(path).shape == load_with_pil(monkeypatch, path).shape == (12, 20)
+
+
+def test_load_grayscale_without_opencv(tmp_path, monkeypatch):
+    """The PIL path returns a 2D uint8 array for colour input"""
+    path = str(tmp_path / "rgb.png")
+    Image.new("RGB", (5, 3), (255, 255, 255)).save(path)
+    
+    arr = load_with_pil(monkeypatch, path)
+    assert arr.shape == (3, 5)
+    assert arr.dtype == np.uint8
+    assert (arr == 255).all()
+
+
+def program_body(path):
+    """Lines of a generated program between the header and the footer"""
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert lines[-3:] == ["M5  ; Laser off", "G0 X0 Y0  ; Return to origin", "; End of program"]
+    body = lines[6:-3]
+    if body and body[0].startswith("S"):
+        body = body[1:]  # Vector power line
+    return body
+
+
+def svg_body(tmp_path, shapes, **generator_kwargs):
+    """Body of the program generated from an SVG holding the given elements"""
+    svg = tmp_path / "art.svg"
+    svg.write_text(f'<svg xmlns="http://www.w3.org/2000/svg">{shapes}</svg>')
+    gcode = str(tmp_path / "art.gcode")
+    gcode_generator.GCodeGenerator(**generator_kwargs).generate_from_svg(str(svg), gcode)
+    return program_body(gcode)
+
+
+def test_png_raster(tmp_path):
+    """Rows alternate direction, blank rows are skipped and only changed words are written"""
+    png = str(tmp_path / "art.png")
+    Image.fromarray(np.array([
+        [255, 0, 128, 255],   # Left to right: two powers
+        [255, 255, 0, 255],   # Right to left
+        [255, 255, 255, 255], # Blank
+        [0, 0, 255, 255],     # Right to left again (serpentine counts blank rows)
+    ], dtype=np.uint8), "L").save(png)
+    gcode = str(tmp_path / "art.gcode")
+    
+    gcode_generator.GCodeGenerator(work_area=(4, 4)).generate_from_png(png, gcode, line_spacing=1)
+    
+    assert program_body(gcode) == [
+        "G1 X1 S1000 F1000",
+        "X2 S498",
+        "G0 X3 Y1 S0",
+        "G1 X2 S1000",
+        "G0 Y3 S0",
+        "G1 X0 S1000",
+    ]
+
+
+def test_redundant_words_omitted(tmp_path):
+    """Motion, coordinates, power and feed rate are only written when they change"""
+    body = svg_body(tmp_path, '<rect x="1" y="1" width="2" height="3"/><line x1="1" y1="1" x2="5" y2="1"/>')
+    assert body == [
+        "X1 Y1 S0",
+        "G1 X3 S800 F1000",
+        "Y4",
+        "X1",
+        "Y1",
+        "X5",  # The line starts where the rectangle ended, so no travel
+    ]
+
+
+def test_zero_length_moves_emit_nothing(tmp_path):
+    """A line to the current point produces no G-code"""
+    assert svg_body(tmp_path, '<path d="M5 5 L5 5 L10 5 L10 5"/>') == [
+        "X5 Y5 S0",
+        "G1 X10 S800 F1000",
+    ]
+
+
+def test_path_commands(tmp_path):
+    """Relative m/h/v/c, absolute H and Z resolve against the current point"""
+    body = svg_body(tmp_path, '<path d="M10 10 h5 v5 H10 Z m20 0 c0 10 10 10 10 0"/>')
+    assert body[:6] == ["X10 Y10 S0", "G1 X15 S800 F1000", "Y15", "X10", "Y10", "G0 X30 S0"]
+    
+    # The curve is cut as G1 segments of about BEZIER_SEGMENT_LENGTH ending at (40, 10)
+    curve = body[6:]
+    assert curve[0].startswith("G1 ") and not any(line.startswith("G") for line in curve[1:])
+    assert len(curve) == math.ceil(30 / gcode_generator.BEZIER_SEGMENT_LENGTH)
+    assert curve[-1] == "X40 Y10"
+
+
+def test_polyline_circle_closes(tmp_path):
+    """A polyline circle ends exactly where it started, with every point on the circle"""
+    body = svg_body(tmp_path, '<circle cx="10" cy="10" r="5"/>', arc_mode="polyline", chord_tol=0.2)
+    assert body[0] == "X15 Y10 S0"
+    assert body[-1] == "X15 Y10"
+    
+    x = y = None
+    for line in body[1:]:
+        words = dict(re.findall(r"([XY])(-?[\d.]+)", line))
+        x, y = float(words.get("X", x)), float(words.get("Y", y))
+        assert abs(math.hypot(x - 10, y - 10) - 5) < 0.01
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
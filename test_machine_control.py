@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Streaming tests for machine_control.py against a simulated GRBL controller
+on a pseudo-terminal (Linux and macOS only)
+
+Run with: python -m pytest test_machine_control.py
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+pty = pytest.importorskip("pty")
+tty = pytest.importorskip("tty")
+pytest.importorskip("serial.threaded")
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import machine_control
+
+
+class FakeGrbl:
+    """
+    Minimal GRBL on a pseudo-terminal.
+    
+    Lines are acknowledged with ok after `delay` seconds each, status
+    queries (?) are answered, $$ lists a few settings before its ok, and a soft reset (Ctrl-X) drops the receive
+    buffer and prints the startup banner, as the real firmware does. With
+    silent=True nothing is ever answered.
+    """
+    
+    SETTINGS = [b'$0=10', b'$1=25', b'$2=0', b'$3=0']
+    
+    def __init__(self, delay=0.0, silent=False):
+        self.master, slave = pty.openpty()
+        tty.setraw(self.master)
+        tty.setraw(slave)
+        self.slave = slave
+        self.name = os.ttyname(slave)
+        self.delay = delay
+        self.silent = silent
+        self.lines = []
+        self.resets = 0
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def _reply(self, data):
+        if not self.silent and not self.closed:
+            try:
+                os.write(self.master, data)
+            except OSError:
+                pass  # Closed by the test
+    
+    def _run(self):
+        pending = b''
+        while not self.closed:
+            try:
+                data = os.read(self.master, 4096)
+            except OSError:
+                return
+            for byte in data:
+                char = bytes([byte])
+                if char == b'?':
+                    self._reply(b'<Idle|MPos:0.000,0.000,0.000|FS:0,0>\r\n')
+                elif char == b'\x18':
+                    pending = b''
+                    self.resets += 1
+                    self._reply(b"\r\nGrbl 1.1h ['$' for help]\r\n")
+                elif char not in (b'!', b'~'):
+                    pending += char
+            while b'\n' in pending:
+                line, pending = pending.split(b'\n', 1)
+                time.sleep(self.delay)
+                self.lines.append(line.decode())
+                if line == b'$$':
+                    self._reply(b''.join(b'%s\r\n' % setting for setting in self.SETTINGS))
+                self._reply(b'ok\r\n')
+    
+    def close(self):
+        self.closed = True
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+@pytest.fixture
+def gcode_file(tmp_path):
+    """A G-code file long enough to still be streaming when stopped"""
+    path = tmp_path / "job.gcode"
+    path.write_text("G21\nG90\n" + "".join(f"G1 X{i % 100} Y{i % 50} F1000\n" for i in range(2000)))
+    return str(path)
+
+
+def start_stream(controller, gcode_file):
+    """Send gcode_file on a thread; returns (thread, result list)"""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(controller.send_gcode_file(gcode_file)),
+                              daemon=True)
+    thread.start()
+    time.sleep(0.5)  # Let it get going
+    assert thread.is_alive(), "Stream finished before it could be stopped"
+    return thread, result
+
+
+def test_stream_completes(tmp_path):
+    """Every line reaches the machine and the send reports success"""
+    lines = ["G21", "G90"] + [f"G1 X{i} Y{i}" for i in range(200)]
+    path = tmp_path / "job.gcode"
+    path.write_text("\n".join(lines) + "\n")
+    
+    grbl = FakeGrbl()
+    controller = machine_control.MachineController()
+    try:
+        assert controller.connect(grbl.name)
+        progress = []
+        assert controller.send_gcode_file(str(path), progress.append)
+        assert grbl.lines == lines
+        assert progress[-1] == 100
+    finally:
+        controller.disconnect()
+        grbl.close()
+
+
+def test_multi_line_reply_then_stream(tmp_path):
+    """A command answered with several lines takes its whole reply, not the next send's oks"""
+    lines = ["G21", "G90"] + [f"G1 X{i} Y{i}" for i in range(50)]
+    path = tmp_path / "job.gcode"
+    path.write_text("\n".join(lines) + "\n")
+    
+    grbl = FakeGrbl()
+    controller = machine_control.MachineController()
+    try:
+        assert controller.connect(grbl.name)
+        response = controller.send_command("$$")
+        assert response.splitlines() == [s.decode() for s in FakeGrbl.SETTINGS] + ["ok"]
+        
+        assert controller.send_gcode_file(str(path))
+        assert grbl.lines == ["$$"] + lines
+        assert controller.send_command("G0 X1") == "ok"
+    finally:
+        controller.disconnect()
+        grbl.close()
+
+
+def test_stop_mid_stream(gcode_file):
+    """Stopping ends the stream at once and leaves the port usable"""
+    grbl = FakeGrbl(delay=0.005)
+    controller = machine_control.MachineController()
+    try:
+        assert controller.connect(grbl.name)
+        thread, result = start_stream(controller, gcode_file)
+        
+        assert controller.stop()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+        assert result == [False]
+        
+        # Wait for the machine to reset before talking to it again
+        deadline = time.monotonic() + 5
+        while not grbl.resets and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert grbl.resets == 1
+        time.sleep(0.2)
+        
+        # Line commands are accepted again
+        assert controller.home()
+        assert controller.send_command("G0 X1") == "ok"
+    finally:
+        controller.disconnect()
+        grbl.close()
+
+
+def test_disconnect_mid_stream(gcode_file):
+    """Disconnecting ends the stream instead of leaving it waiting for replies"""
+    grbl = FakeGrbl(delay=0.005)
+    controller = machine_control.MachineController()
+    try:
+        assert controller.connect(grbl.name)
+        thread, result = start_stream(controller, gcode_file)
+        
+        controller.disconnect()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+        assert result == [False]
+        assert not controller._streaming
+    finally:
+        grbl.close()
+
+
+def test_silent_machine(gcode_file, monkeypatch):
+    """A machine that stops answering entirely ends the stream after the stall timeout"""
+    monkeypatch.setattr(machine_control, "STREAM_STALL_TIMEOUT", 1.0)
+    grbl = FakeGrbl(silent=True)
+    controller = machine_control.MachineController()
+    try:
+        assert controller.connect(grbl.name)
+        started = time.monotonic()
+        assert controller.send_gcode_file(gcode_file) is False
+        assert time.monotonic() - started < 10
+        assert not controller._streaming
+    finally:
+        controller.disconnect()
+        grbl.close()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
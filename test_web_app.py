@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Tests for web_app.py: conversions, and the background G-code send endpoints
+with a stub machine controller
+
+Run with: python -m pytest test_web_app.py
+"""
+
+import atexit
+import dataclasses
+import datetime
+import decimal
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+
+import pytest
+
+pytest.importorskip("flask")
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Keep the app's folders out of the source tree
+_folders = tempfile.mkdtemp(prefix="improved-enigma-test-")
+atexit.register(shutil.rmtree, _folders, ignore_errors=True)
+os.environ.setdefault("UPLOAD_FOLDER", os.path.join(_folders, "uploads"))
+os.environ.setdefault("OUTPUT_FOLDER", os.path.join(_folders, "outputs"))
+
+import web_app
+
+requires_machine_control = pytest.mark.skipif(not web_app.MACHINE_CONTROL_AVAILABLE,
+                                              reason="machine control not installed")
+
+
+class StubController:
+    """Connected controller whose send runs until released, stopped or disconnected"""
+    
+    def __init__(self):
+        self.active_connection = object()
+        self.release = threading.Event()
+        self.ended = threading.Event()
+        self.success = True
+    
+    def send_gcode_file(self, filepath, progress_callback=None):
+        progress_callback(50)
+        while not (self.release.is_set() or self.ended.is_set()):
+            time.sleep(0.01)
+        return self.success and not self.ended.is_set()
+    
+    def stop(self):
+        self.ended.set()
+        return True
+    
+    def disconnect(self):
+        self.ended.set()
+        self.active_connection = None
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    """Stub controller and G-code generator in place of the real ones"""
+    stub = StubController()
+    monkeypatch.setattr(web_app.machine_control, "get_controller", lambda: stub)
+    monkeypatch.setattr(web_app.gcode_generator, "generate_gcode_from_file",
+                        lambda src, dst, **kwargs: open(dst, "w").close())
+    yield stub
+    stub.ended.set()  # Never leave the machine thread busy
+    for job_id, (_, future, _, _) in list(web_app.send_jobs.items()):
+        future.result(timeout=5)
+        web_app.send_jobs.pop(job_id, None)
+
+
+@pytest.fixture
+def client():
+    """Flask test client"""
+    return web_app.app.test_client()
+
+
+@pytest.fixture
+def output_file():
+    """A converted file to send"""
+    name = "0123abcd_job_converted.svg"
+    with open(os.path.join(web_app.OUTPUT_FOLDER, name), "w") as f:
+        f.write("<svg/>")
+    return name
+
+
+def upload(client, name, data):
+    """Upload data under name; returns the stored filename"""
+    response = client.post("/api/upload", data={"file": (io.BytesIO(data), name)},
+                           content_type="multipart/form-data")
+    assert response.status_code == 200
+    return response.json["filename"]
+
+
+CONVERTED_SVG = (b'<svg xmlns="http://www.w3.org/2000/svg" width="10mm" height="10mm" '
+                 b'viewBox="0 0 10 10"><rect x="1" y="1" width="8" height="8"/></svg>')
+
+
+def test_convert_already_converted_svg(client):
+    """An uploaded *_converted.svg is written to the output folder and can be downloaded"""
+    filename = upload(client, "logo_converted.svg", CONVERTED_SVG)
+    response = client.post("/api/convert", json={"filename": filename, "output_type": "svg"})
+    assert response.status_code == 200
+    output_filename = response.json["output_filename"]
+    
+    download = client.get(f"/api/download/{output_filename}")
+    assert download.status_code == 200
+    assert download.data == CONVERTED_SVG
+
+
+def test_convert_multi_already_converted_svg(client):
+    """Multi-format conversion of a *_converted.svg still produces a downloadable SVG"""
+    filename = upload(client, "logo_converted.svg", CONVERTED_SVG)
+    response = client.post("/api/convert-multi", json={"filename": filename})
+    assert response.status_code == 200
+    outputs = response.json["outputs"]
+    assert "svg" in outputs
+    
+    download = client.get(f"/api/download/{outputs['svg']['filename']}")
+    assert download.status_code == 200
+    assert download.data == CONVERTED_SVG
+
+
+def test_download_all_streams_members_in_chunks(client):
+    """download-all yields a valid ZIP in pieces no larger than about one read chunk"""
+    members = {
+        "feedc0de_art_png300.png": os.urandom(1024 * 1024),
+        "feedc0de_art_svg.svg": b"<svg>" + b"<rect/>" * 100000 + b"</svg>",
+    }
+    for name, data in members.items():
+        with open(os.path.join(web_app.OUTPUT_FOLDER, name), "wb") as f:
+            f.write(data)
+    
+    response = client.get("/api/download-all/feedc0de", buffered=False)
+    assert response.status_code == 200
+    chunks = list(response.response)
+    assert len(chunks) > 1
+    assert max(len(chunk) for chunk in chunks) < 2 * web_app.ZIP_CHUNK_SIZE
+    
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.read("art_png300.png") == members["feedc0de_art_png300.png"]
+        assert archive.read("art_svg.svg") == members["feedc0de_art_svg.svg"]
+        assert archive.getinfo("art_png300.png").compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo("art_svg.svg").compress_type == zipfile.ZIP_DEFLATED
+
+
+def test_orjson_provider_matches_default():
+    """The orjson provider gives the same JSON values as Flask's default provider"""
+    if not web_app.ORJSON_AVAILABLE:
+        pytest.skip("orjson not installed")
+    
+    @dataclasses.dataclass
+    class Point:
+        x: int
+    
+    obj = {2: "two", 1: [datetime.datetime(2024, 1, 2, 3, 4, 5), datetime.date(2024, 1, 2),
+                         decimal.Decimal("1.5"), uuid.UUID(int=5), Point(3), "é"]}
+    expected = DefaultJSONProvider(web_app.app).dumps(obj)
+    assert json.loads(web_app.app.json.dumps(obj)) == json.loads(expected)
+    with web_app.app.app_context():
+        assert web_app.app.json.response(obj).get_json() == json.loads(expected)
+
+
+def wait_for_result(client, job_id):
+    """Poll send-status until the job finishes; returns the final response"""
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        response = client.get(f"/api/machines/send-status/{job_id}")
+        if response.json.get("status") != "running":
+            return response
+        time.sleep(0.02)
+    pytest.fail("Send job did not finish")
+
+
+@requires_machine_control
+def test_send_runs_in_background(client, controller, output_file):
+    """202 at once, progress while running, 409 for a second send, then the result"""
+    response = client.post("/api/machines/send-gcode", json={"filename": output_file})
+    assert response.status_code == 202
+    job_id = response.json["job_id"]
+    
+    time.sleep(0.1)
+    status = client.get(f"/api/machines/send-status/{job_id}")
+    assert status.json == {"status": "running", "progress": 50}
+    
+    busy = client.post("/api/machines/send-gcode", json={"filename": output_file})
+    assert busy.status_code == 409
+    assert busy.json["job_id"] == job_id
+    
+    controller.release.set()
+    result = wait_for_result(client, job_id)
+    assert result.status_code == 200
+    assert result.json["success"]
+    assert result.json["gcode_file"] == "0123abcd_job_converted.gcode"
+    
+    # Collected results are forgotten
+    assert client.get(f"/api/machines/send-status/{job_id}").status_code == 404
+
+
+@requires_machine_control
+def test_failed_send(client, controller, output_file):
+    """A send the controller reports as failed ends with an error"""
+    controller.success = False
+    controller.release.set()
+    job_id = client.post("/api/machines/send-gcode", json={"filename": output_file}).json["job_id"]
+    result = wait_for_result(client, job_id)
+    assert result.status_code == 500
+    assert not result.json["success"]
+
+
+@requires_machine_control
+@pytest.mark.parametrize("end_job", [
+    lambda client, job_id: client.post(f"/api/machines/send-cancel/{job_id}"),
+    lambda client, job_id: client.post("/api/machines/control", json={"action": "stop"}),
+    lambda client, job_id: client.post("/api/machines/disconnect"),
+], ids=["cancel", "stop", "disconnect"])
+def test_send_can_be_ended(client, controller, output_file, end_job):
+    """Cancel, stop and disconnect end a running send and free the machine"""
+    job_id = client.post("/api/machines/send-gcode", json={"filename": output_file}).json["job_id"]
+    time.sleep(0.05)
+    end_job(client, job_id)
+    
+    result = wait_for_result(client, job_id)
+    assert result.status_code == 409
+    assert result.json["error"] == "Cancelled"
+    
+    # A new send is accepted again
+    controller.ended.clear()
+    controller.active_connection = object()
+    controller.release.set()
+    response = client.post("/api/machines/send-gcode", json={"filename": output_file})
+    assert response.status_code == 202
+    assert wait_for_result(client, response.json["job_id"]).status_code == 200
+
+
+@requires_machine_control
+def test_send_status_unknown_job(client):
+    """Unknown job ids are 404"""
+    assert client.get("/api/machines/send-status/nope").status_code == 404
+    assert client.post("/api/machines/send-cancel/nope").status_code == 404
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
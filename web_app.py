@@ -4,48 +4,294 @@ Flask web application for laser engraving file converter.
 Provides a web interface accessible from any device for file conversion.
 """
 
+import io
 import os
-import uuid
+import re
+import json
+import hashlib
+import secrets
+import shutil
+import multiprocessing
+import tempfile
+import threading
 import time
 import zipfile
+from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, send_file, jsonify, send_from_directory
+from flask import Flask, Request, Response, render_template, request, send_file, jsonify, send_from_directory
+from flask.json.provider import DefaultJSONProvider
 from werkzeug.utils import secure_filename
 import converter_core
 
+# orjson encodes responses several times faster than the json module
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Machine control and G-code generation; the converter stays usable
+# without them (the machine endpoints then answer 503)
+try:
+    import machine_control
+    import gcode_generator
+    MACHINE_CONTROL_AVAILABLE = True
+except ImportError:
+    MACHINE_CONTROL_AVAILABLE = False
+
+
+class UploadRequest(Request):
+    """
+    Request that writes uploaded files straight into the upload folder.
+    
+    Werkzeug's default keeps uploads in a temporary file elsewhere, which
+    file.save() then copies; here the upload is only renamed (see
+    save_upload). Uploads that are not kept are removed when the request
+    closes.
+    """
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.NamedTemporaryFile('wb+', buffering=UPLOAD_WRITE_BUFFER,
+                                           dir=UPLOAD_FOLDER,
+                                           prefix='.upload-', delete=False)
+    
+    def close(self):
+        files = self.__dict__.get('files')  # Only if the form was parsed
+        super().close()
+        for file in (files.values() if files is not None else ()):
+            try:
+                os.remove(file.stream.name)
+            except (AttributeError, TypeError, OSError):
+                pass  # Already renamed by save_upload
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider that uses orjson.
+    
+    Produces the same JSON values as the default provider: keys are sorted,
+    non-string keys are turned into strings, and dates, dataclasses, UUIDs,
+    Decimals and objects with __html__ go through the default provider's
+    default(). Only the bytes differ: output is compact, non-ASCII text is
+    written as UTF-8 rather than escaped, and NaN becomes null.
+    """
+    
+    # Dates and dataclasses are passed to default() rather than serialized
+    # by orjson, which would format dates as ISO 8601 instead of HTTP dates
+    OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+               | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS) if ORJSON_AVAILABLE else 0
+    
+    def dumps(self, obj, **kwargs):
+        if kwargs:  # indent, separators, ... only the json module knows
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.OPTIONS).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        option = self.OPTIONS | orjson.OPT_APPEND_NEWLINE
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        body = orjson.dumps(obj, default=self.default, option=option)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
 app = Flask(__name__)
+app.request_class = UploadRequest
+if ORJSON_AVAILABLE:
+    app.json = OrjsonProvider(app)
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
-app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(__file__), 'uploads')
-app.config['OUTPUT_FOLDER'] = os.path.join(os.path.dirname(__file__), 'outputs')
+# Fixed for the life of the process; handlers use these constants rather
+# than looking the folders up in app.config on every request. Uploads are
+# only kept until converted, so UPLOAD_FOLDER can point at a tmpfs mount
+UPLOAD_FOLDER = os.path.abspath(os.environ.get(
+    'UPLOAD_FOLDER', os.path.join(os.path.dirname(__file__), 'uploads')))
+OUTPUT_FOLDER = os.path.abspath(os.environ.get(
+    'OUTPUT_FOLDER', os.path.join(os.path.dirname(__file__), 'outputs')))
+app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+app.config['OUTPUT_FOLDER'] = OUTPUT_FOLDER
 app.config['SECRET_KEY'] = os.urandom(24)
+# Behind Apache/lighttpd with X-Sendfile enabled, downloads are sent by the
+# web server straight from disk; otherwise send_file hands the open file to
+# the WSGI server (gunicorn sends it with sendfile)
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE', 'False').lower() == 'true'
 
 # Create folders if they don't exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+
+# Conversions requested with "async": true run on these threads, so the
+# request returns at once and the worker stays free; the client polls
+# /api/convert/status/<job_id>. Jobs live in this process, so deployments
+# with several worker processes need sticky sessions for async requests
+CONVERT_WORKERS = int(os.environ.get('CONVERT_WORKERS', os.cpu_count() or 1))
+convert_executor = ThreadPoolExecutor(max_workers=CONVERT_WORKERS)
+convert_jobs = {}  # job_id -> (submit time, Future of (response, status code))
+
+# Seconds a finished job's result is kept for the client to collect
+CONVERT_JOB_TTL = 3600
+
+# G-code is generated and streamed to the machine on this thread, so a job
+# that runs for minutes does not hold a request worker (or hit gunicorn's
+# --timeout); the client polls /api/machines/send-status/<job_id>. One
+# thread, since there is one controller and one job at a time. Stop,
+# emergency stop, disconnect and /api/machines/send-cancel/<job_id> end the
+# running job; the controller also gives up on a machine gone silent
+machine_executor = ThreadPoolExecutor(max_workers=1)
+send_jobs = {}  # job_id -> (submit time, Future of (response, status code), progress dict, cancel Event)
+
+# Uploads and outputs are deleted after FILE_MAX_AGE seconds; uploads check
+# for old files at most once per CLEANUP_INTERVAL seconds
+FILE_MAX_AGE = 3600
+CLEANUP_INTERVAL = 60
+
+# Bytes each folder may hold; above this the least recently used files are
+# deleted even if they are not old yet, so a burst of uploads cannot fill
+# the disk
+FOLDER_MAX_BYTES = int(os.environ.get('FOLDER_MAX_BYTES', 2 * 1024 ** 3))
+
+# A small upload folder (such as a tmpfs) must fit two maximum-size uploads;
+# its cap is lowered so that room for them always stays free. A folder set
+# with the UPLOAD_FOLDER override that lacks the room is a deployment
+# mistake and stops startup; the default folder only logs a warning
+_upload_space = shutil.disk_usage(UPLOAD_FOLDER)
+_upload_headroom = 2 * app.config['MAX_CONTENT_LENGTH']
+UPLOAD_FOLDER_MAX_BYTES = FOLDER_MAX_BYTES
+if _upload_space.total > _upload_headroom:
+    UPLOAD_FOLDER_MAX_BYTES = min(FOLDER_MAX_BYTES, _upload_space.total - _upload_headroom)
+if _upload_space.free < _upload_headroom:
+    _upload_space_message = (
+        f"Upload folder {UPLOAD_FOLDER} has {_upload_space.free // 1024 ** 2} MB free; "
+        f"at least {_upload_headroom // 1024 ** 2} MB is needed"
+    )
+    if 'UPLOAD_FOLDER' in os.environ:
+        raise RuntimeError(_upload_space_message)
+    app.logger.warning(_upload_space_message)
+_last_cleanup = 0.0
+_cleanup_lock = threading.Lock()
+
+# Uploads arrive in small chunks from the form parser; buffering them
+# turns one write() per chunk into one per UPLOAD_WRITE_BUFFER bytes
+UPLOAD_WRITE_BUFFER = 1024 * 1024
 
-ALLOWED_EXTENSIONS = {
+# Deflate level for ZIP members; level 1 is several times faster than the
+# default 6 and only slightly larger on SVG output
+ZIP_COMPRESS_LEVEL = 1
+
+# Bytes read per chunk when streaming a ZIP member
+ZIP_CHUNK_SIZE = 64 * 1024
+
+# Already compressed formats; deflating them again costs CPU for no gain
+STORED_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg'})
+
+# Content hashes of downloaded files, keyed by (inode, mtime, size) so a
+# rewritten file is hashed again; at most ETAG_CACHE_SIZE entries
+ETAG_CACHE_SIZE = 1024
+_etag_cache = {}
+_etag_lock = threading.Lock()  # Requests are served on several threads
+
+ALLOWED_EXTENSIONS = frozenset({
     'svg', 'dxf', 'ai', 'eps',  # Vector formats
     'png', 'jpg', 'jpeg', 'bmp', 'tiff', 'tif'  # Raster formats
-}
+})
+
+
+# Stored files are named "<unique id>_<original name>"; parsed with one
+# match instead of splitting and re-joining the name
+STORED_NAME_RE = re.compile(r'(?:(?P<uid>[^_]*)_)?(?P<base>.*?)(?P<ext>\.[^.]*)?')
+
+
+def parse_stored_name(filename):
+    """
+    Split a stored file name into its parts.
+    
+    Args:
+        filename: Name of a file in the upload or output folder
+        
+    Returns:
+        Tuple of (unique id, base name, extension with dot); missing parts are ''
+    """
+    match = STORED_NAME_RE.fullmatch(filename)
+    return match['uid'] or '', match['base'], match['ext'] or ''
 
 
 def allowed_file(filename):
     """Check if file extension is allowed."""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    _, dot, ext = filename.rpartition('.')
+    return bool(dot) and ext.lower() in ALLOWED_EXTENSIONS
+
+
+def save_upload(file, filepath):
+    """
+    Store an uploaded file at filepath.
+    
+    Args:
+        file: Uploaded file from request.files
+        filepath: Destination path in the upload folder
+    """
+    temp_path = getattr(file.stream, 'name', None)
+    if isinstance(temp_path, str) and os.path.dirname(temp_path) == UPLOAD_FOLDER:
+        # Already written to the upload folder by UploadRequest
+        file.stream.close()
+        os.replace(temp_path, filepath)
+    else:
+        file.save(filepath)
 
 
 def cleanup_old_files():
-    """Remove files older than 1 hour."""
-    current_time = time.time()
-    for folder in [app.config['UPLOAD_FOLDER'], app.config['OUTPUT_FOLDER']]:
-        for filename in os.listdir(folder):
-            filepath = os.path.join(folder, filename)
-            if os.path.isfile(filepath):
-                if current_time - os.path.getmtime(filepath) > 3600:  # 1 hour
-                    try:
-                        os.remove(filepath)
-                    except Exception:
-                        pass
+    """
+    Remove files older than FILE_MAX_AGE (1 hour), then the least recently
+    used files of any folder holding more than its cap (FOLDER_MAX_BYTES,
+    or UPLOAD_FOLDER_MAX_BYTES for uploads).
+    """
+    cutoff = time.time() - FILE_MAX_AGE
+    for folder, max_bytes in [(UPLOAD_FOLDER, UPLOAD_FOLDER_MAX_BYTES),
+                              (OUTPUT_FOLDER, FOLDER_MAX_BYTES)]:
+        kept = []  # (last used, size, path)
+        total_size = 0
+        
+        # scandir gets the file type with the listing; one stat per file
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                try:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                    if st.st_mtime < cutoff:
+                        os.remove(entry.path)
+                    else:
+                        # Downloads set the access time (see download_file)
+                        kept.append((max(st.st_atime, st.st_mtime), st.st_size, entry.path))
+                        total_size += st.st_size
+                except OSError:
+                    pass
+        
+        if total_size > max_bytes:
+            kept.sort()
+            for _, size, path in kept:
+                try:
+                    os.remove(path)
+                    total_size -= size
+                except OSError:
+                    pass
+                if total_size <= max_bytes:
+                    break
+
+
+def schedule_cleanup():
+    """Run cleanup_old_files in the background, at most once per CLEANUP_INTERVAL."""
+    global _last_cleanup
+    with _cleanup_lock:
+        now = time.time()
+        if now - _last_cleanup < CLEANUP_INTERVAL:
+            return
+        _last_cleanup = now
+    threading.Thread(target=cleanup_old_files, daemon=True).start()
 
 
 @app.route('/')
@@ -54,24 +300,82 @@ def index():
     return render_template('index.html')
 
 
+def static_json(data):
+    """
+    Serialize a response that never changes while the app runs.
+    
+    Args:
+        data: JSON-serializable response data
+        
+    Returns:
+        Tuple of (JSON bytes, ETag)
+    """
+    body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    return body, hashlib.sha1(body).hexdigest()
+
+
+def static_json_response(cached):
+    """
+    Send a response prepared by static_json; 304 if the client has it.
+    
+    Args:
+        cached: Tuple of (JSON bytes, ETag)
+    """
+    body, etag = cached
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+def file_etag(filepath, st):
+    """
+    Content hash of a file for use as its ETag, computed once per version.
+    
+    Args:
+        filepath: Path of the file
+        st: os.stat() result for the file
+        
+    Returns:
+        Hex digest of the file contents
+    """
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    with _etag_lock:
+        etag = _etag_cache.get(key)
+    if etag is None:
+        # Hashed outside the lock so other downloads are not held up
+        digest = hashlib.sha1()
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        etag = digest.hexdigest()
+        with _etag_lock:
+            if len(_etag_cache) >= ETAG_CACHE_SIZE:
+                _etag_cache.pop(next(iter(_etag_cache)), None)  # Oldest entry
+            _etag_cache[key] = etag
+    return etag
+
+
+# Both lists are fixed, so they are serialized once
+USE_CASES_JSON = static_json({'use_cases': list(converter_core.MATERIAL_SUGGESTIONS['svg'].keys())})
+BEST_PRACTICES_JSON = static_json({'practices': converter_core.get_best_practices()})
+
+
 @app.route('/api/use-cases')
 def get_use_cases():
     """Get available use cases."""
-    use_cases = list(converter_core.MATERIAL_SUGGESTIONS['svg'].keys())
-    return jsonify({'use_cases': use_cases})
+    return static_json_response(USE_CASES_JSON)
 
 
 @app.route('/api/best-practices')
 def get_best_practices():
     """Get best practices for laser engraving."""
-    practices = converter_core.get_best_practices()
-    return jsonify({'practices': practices})
+    return static_json_response(BEST_PRACTICES_JSON)
 
 
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
     """Handle file upload."""
-    cleanup_old_files()
+    schedule_cleanup()
     
     if 'file' not in request.files:
         return jsonify({'error': 'No file provided'}), 400
@@ -86,12 +390,12 @@ def upload_file():
     
     # Generate unique filename
     original_filename = secure_filename(file.filename)
-    unique_id = str(uuid.uuid4())[:8]
+    unique_id = secrets.token_hex(4)
     filename = f"{unique_id}_{original_filename}"
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    filepath = os.path.join(UPLOAD_FOLDER, filename)
     
     # Save file
-    file.save(filepath)
+    save_upload(file, filepath)
     
     # Detect file type
     try:
@@ -111,6 +415,51 @@ def upload_file():
 
 
 
+def run_conversion(job, data):
+    """
+    Run a conversion job for a request, or queue it if the client asked.
+    
+    Args:
+        job: Function taking the request data and returning (response, status code)
+        data: Request JSON
+        
+    Returns:
+        Flask response; {'job_id'} with status 202 for an "async" request
+    """
+    if not data.get('async'):
+        response, status = job(data)
+        return jsonify(response), status
+    
+    # Forget results nobody collected
+    now = time.time()
+    for job_id, (submitted, future) in list(convert_jobs.items()):
+        if future.done() and now - submitted > CONVERT_JOB_TTL:
+            convert_jobs.pop(job_id, None)
+    
+    job_id = secrets.token_hex(16)
+    convert_jobs[job_id] = (now, convert_executor.submit(job, data))
+    return jsonify({'success': True, 'job_id': job_id}), 202
+
+
+@app.route('/api/convert/status/<job_id>')
+def convert_status(job_id):
+    """Get the result of an async conversion, or {'status': 'running'}."""
+    job = convert_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    future = job[1]
+    if not future.done():
+        return jsonify({'status': 'running'})
+    
+    convert_jobs.pop(job_id, None)
+    try:
+        response, status = future.result()
+    except Exception as e:
+        response, status = {'error': str(e)}, 500
+    return jsonify(response), status
+
+
 @app.route('/api/convert-multi', methods=['POST'])
 def convert_file_multi():
     """Handle multi-format file conversion - generates all recommended formats."""
@@ -119,31 +468,32 @@ def convert_file_multi():
     if not data or 'filename' not in data:
         return jsonify({'error': 'No filename provided'}), 400
     
+    return run_conversion(convert_multi_job, data)
+
+
+def convert_multi_job(data):
+    """
+    Convert an uploaded file to all recommended formats.
+    
+    Args:
+        data: Request JSON with 'filename' and optional 'use_case'
+        
+    Returns:
+        Tuple of (response dict, HTTP status code)
+    """
     filename = data['filename']
     use_case = data.get('use_case', 'general')
     
-    input_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    input_path = os.path.join(UPLOAD_FOLDER, filename)
     
     if not os.path.exists(input_path):
-        return jsonify({'error': 'File not found'}), 404
+        return {'error': 'File not found'}, 404
     
-    # Convert file to all formats
-    result = converter_core.convert_file_multi_format(
-        input_path,
-        use_case=use_case,
-        verbose=False
-    )
-    
-    if not result['success']:
-        return jsonify({'error': result['error']}), 500
+    # Output filenames; the converter writes straight into the output folder
+    unique_id, base_name, _ = parse_stored_name(filename)
     
-    # Move converted files to output folder and prepare response
-    unique_id = filename.split('_')[0]
-    base_name = '_'.join(filename.split('_')[1:])
-    base_name = os.path.splitext(base_name)[0]
-    
-    outputs_info = {}
-    for format_key, output_data in result['outputs'].items():
+    output_paths = {}
+    for format_key in converter_core.MULTI_FORMAT_INFO:
         # Determine file extension
         if 'svg' in format_key:
             ext = 'svg'
@@ -153,19 +503,27 @@ def convert_file_multi():
         # Create output filename
         format_suffix = format_key.replace('_', '')  # e.g., 'png300'
         output_filename = f"{unique_id}_{base_name}_{format_suffix}.{ext}"
-        output_path = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
-        
-        # Move file
-        import shutil
-        if output_data['path'] != output_path:
-            shutil.move(output_data['path'], output_path)
-        
-        # Get file size
-        file_size = os.path.getsize(output_path)
+        output_paths[format_key] = os.path.join(OUTPUT_FOLDER, output_filename)
+    
+    # Convert file to all formats
+    result = converter_core.convert_file_multi_format(
+        input_path,
+        use_case=use_case,
+        verbose=False,
+        output_paths=output_paths
+    )
+    
+    if not result['success']:
+        return {'error': result['error']}, 500
+    
+    # Prepare response
+    outputs_info = {}
+    for format_key, output_data in result['outputs'].items():
+        file_size = output_data['size']
         file_size_mb = round(file_size / (1024 * 1024), 2)
         
         outputs_info[format_key] = {
-            'filename': output_filename,
+            'filename': os.path.basename(output_data['path']),
             'format': output_data['format'],
             'description': output_data['description'],
             'file_size': file_size,
@@ -173,42 +531,105 @@ def convert_file_multi():
             'material_suggestion': output_data['suggestion']
         }
     
-    return jsonify({
+    return {
         'success': True,
         'file_type': result['file_type'],
         'outputs': outputs_info
-    })
+    }, 200
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only stream that collects what is written for a generator to yield."""
+    
+    def __init__(self):
+        self.chunks = []
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def take(self):
+        """Return everything written since the last call."""
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _zip_member_info(filepath, name):
+    """
+    Build the ZipInfo for a stream_zip member.
+    
+    Already compressed formats are stored; everything else is deflated at
+    ZIP_COMPRESS_LEVEL, which ZipFile.open() takes from the ZipInfo
+    (compress_level from Python 3.13, _compresslevel before).
+    """
+    info = zipfile.ZipInfo.from_file(filepath, name)
+    if os.path.splitext(name)[1].lower() in STORED_EXTENSIONS:
+        info.compress_type = zipfile.ZIP_STORED
+    else:
+        info.compress_type = zipfile.ZIP_DEFLATED
+        if hasattr(zipfile.ZipInfo, 'compress_level'):
+            info.compress_level = ZIP_COMPRESS_LEVEL
+        else:
+            info._compresslevel = ZIP_COMPRESS_LEVEL
+    return info
+
+
+def stream_zip(members):
+    """
+    Build a ZIP file while it is being sent.
+    
+    Members are copied ZIP_CHUNK_SIZE bytes at a time and the compressed
+    output is yielded as it is produced, so no whole member is ever held
+    in memory.
+    
+    Args:
+        members: List of (file path, name in the archive) pairs
+        
+    Yields:
+        Consecutive chunks of the ZIP file
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for filepath, name in members:
+            info = _zip_member_info(filepath, name)
+            with open(filepath, 'rb') as src, zipf.open(info, 'w') as dst:
+                while True:
+                    chunk = src.read(ZIP_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    data = sink.take()
+                    if data:
+                        yield data
+            yield sink.take()  # Rest of the member and its data descriptor
+    yield sink.take()  # Central directory
 
 
 @app.route('/api/download-all/<unique_id>', methods=['GET'])
 def download_all_files(unique_id):
-    """Create and download a ZIP file containing all converted files."""
+    """Download a ZIP file containing all converted files."""
     # Find all files with this unique_id in the output folder
-    output_files = []
-    for filename in os.listdir(app.config['OUTPUT_FOLDER']):
-        if filename.startswith(unique_id + '_'):
-            output_files.append(filename)
+    members = []
+    for filename in os.listdir(OUTPUT_FOLDER):
+        # Don't include old zip files
+        if filename.startswith(unique_id + '_') and not filename.endswith('.zip'):
+            # Add file to ZIP with clean name (remove unique ID)
+            _, base_name, ext = parse_stored_name(filename)
+            clean_name = base_name + ext
+            members.append((os.path.join(OUTPUT_FOLDER, filename), clean_name))
     
-    if not output_files:
+    if not members:
         return jsonify({'error': 'No files found'}), 404
     
-    # Create ZIP file
-    zip_filename = f"{unique_id}_all_formats.zip"
-    zip_path = os.path.join(app.config['OUTPUT_FOLDER'], zip_filename)
-    
-    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for filename in output_files:
-            if not filename.endswith('.zip'):  # Don't include old zip files
-                filepath = os.path.join(app.config['OUTPUT_FOLDER'], filename)
-                # Add file to ZIP with clean name (remove unique ID)
-                clean_name = '_'.join(filename.split('_')[1:])
-                zipf.write(filepath, clean_name)
-    
-    return send_file(
-        zip_path,
-        as_attachment=True,
-        download_name='laser_engraving_all_formats.zip',
-        mimetype='application/zip'
+    # The ZIP is built as it is sent, never written to disk
+    return Response(
+        stream_zip(members),
+        mimetype='application/zip',
+        headers={'Content-Disposition': 'attachment; filename=laser_engraving_all_formats.zip'}
     )
 
 
@@ -220,103 +641,145 @@ def convert_file():
     if not data or 'filename' not in data:
         return jsonify({'error': 'No filename provided'}), 400
     
+    return run_conversion(convert_job, data)
+
+
+def convert_job(data):
+    """
+    Convert an uploaded file to one format.
+    
+    Args:
+        data: Request JSON with 'filename' and optional 'output_type',
+            'dpi', 'threshold' and 'use_case'
+        
+    Returns:
+        Tuple of (response dict, HTTP status code)
+    """
     filename = data['filename']
     output_type = data.get('output_type', 'svg')
     dpi = int(data.get('dpi', 300))
     threshold = int(data.get('threshold', 128))
     use_case = data.get('use_case', 'general')
     
-    input_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    input_path = os.path.join(UPLOAD_FOLDER, filename)
     
     if not os.path.exists(input_path):
-        return jsonify({'error': 'File not found'}), 404
+        return {'error': 'File not found'}, 404
     
     # Generate output filename
-    unique_id = filename.split('_')[0]
-    base_name = '_'.join(filename.split('_')[1:])
-    base_name = os.path.splitext(base_name)[0]
+    unique_id, base_name, _ = parse_stored_name(filename)
     output_filename = f"{unique_id}_{base_name}_converted.{output_type}"
-    output_path = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
+    output_path = os.path.join(OUTPUT_FOLDER, output_filename)
     
-    # Convert file
+    # Convert file straight into the output folder
     result = converter_core.convert_file(
         input_path,
         output_type=output_type,
         dpi=dpi,
         threshold=threshold,
         use_case=use_case,
-        verbose=False
+        verbose=False,
+        output_path=output_path
     )
     
     if not result['success']:
-        return jsonify({'error': result['error']}), 500
-    
-    # Move converted file to output folder
-    if result['output_path'] != output_path:
-        import shutil
-        shutil.move(result['output_path'], output_path)
+        return {'error': result['error']}, 500
     
     # Get file size
     file_size = os.path.getsize(output_path)
     file_size_mb = round(file_size / (1024 * 1024), 2)
     
-    return jsonify({
+    return {
         'success': True,
         'output_filename': output_filename,
         'file_type': result['file_type'],
         'material_suggestion': result['material_suggestion'],
         'file_size': file_size,
         'file_size_mb': file_size_mb
-    })
+    }, 200
 
 
 @app.route('/api/download/<filename>')
 def download_file(filename):
     """Download converted file with proper MIME types and clean filenames."""
     filename = secure_filename(filename)
-    filepath = os.path.join(app.config['OUTPUT_FOLDER'], filename)
+    filepath = os.path.join(OUTPUT_FOLDER, filename)
     
-    if not os.path.exists(filepath):
+    try:
+        st = os.stat(filepath)
+    except OSError:
         return jsonify({'error': 'File not found'}), 404
     
+    # Mark the file as recently used for cleanup_old_files, also on
+    # filesystems mounted without access times
+    try:
+        os.utime(filepath, ns=(time.time_ns(), st.st_mtime_ns))
+    except OSError:
+        pass
+    
+    _, base_name, ext = parse_stored_name(filename)
+    
     # Determine MIME type based on file extension
-    ext = os.path.splitext(filename)[1].lower()
     mime_types = {
         '.svg': 'image/svg+xml',
         '.png': 'image/png',
         '.jpg': 'image/jpeg',
         '.jpeg': 'image/jpeg'
     }
-    mime_type = mime_types.get(ext, 'application/octet-stream')
+    mime_type = mime_types.get(ext.lower(), 'application/octet-stream')
     
     # Create a clean, user-friendly download filename
     # Remove the unique ID prefix for cleaner downloads
-    parts = filename.split('_', 1)
-    if len(parts) > 1:
-        clean_filename = parts[1]  # Remove unique ID
-    else:
-        clean_filename = filename
+    clean_filename = base_name + ext
     
+    # The ETag follows the content, so a client holding the same bytes gets
+    # 304 Not Modified even if the file was converted again
     return send_file(
         filepath,
         as_attachment=True,
         download_name=clean_filename,
-        mimetype=mime_type
+        mimetype=mime_type,
+        etag=file_etag(filepath, st)
     )
 
 
+# (second, JSON body) of the last health response; load balancers poll
+# /health often and a timestamp to the second is enough
+_health_cache = (None, b'')
+
+
 @app.route('/health')
 def health():
     """Health check endpoint."""
-    return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
+    global _health_cache
+    now = int(time.time())
+    second, body = _health_cache
+    if second != now:
+        body, _ = static_json({'status': 'healthy',
+                               'timestamp': datetime.fromtimestamp(now).isoformat()})
+        _health_cache = (now, body)
+    return Response(body, mimetype='application/json')
 
 
 # Machine Control Endpoints
+def requires_machine_control(view):
+    """Answer 503 from a machine endpoint when machine control is missing."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not MACHINE_CONTROL_AVAILABLE:
+            return jsonify({
+                'success': False,
+                'error': 'Machine control is not installed'
+            }), 503
+        return view(*args, **kwargs)
+    return wrapper
+
+
 @app.route('/api/machines/scan', methods=['GET'])
+@requires_machine_control
 def scan_machines():
     """Scan for connected laser engraving machines."""
     try:
-        import machine_control
         machines = machine_control.scan_for_machines()
         return jsonify({
             'success': True,
@@ -333,6 +796,7 @@ def scan_machines():
 
 
 @app.route('/api/machines/connect', methods=['POST'])
+@requires_machine_control
 def connect_machine():
     """Connect to a specific machine."""
     data = request.json
@@ -344,7 +808,6 @@ def connect_machine():
     baudrate = data.get('baudrate', 115200)
     
     try:
-        import machine_control
         controller = machine_control.get_controller()
         success = controller.connect(port, baudrate)
         
@@ -367,11 +830,12 @@ def connect_machine():
 
 
 @app.route('/api/machines/disconnect', methods=['POST'])
+@requires_machine_control
 def disconnect_machine():
     """Disconnect from active machine."""
     try:
-        import machine_control
         controller = machine_control.get_controller()
+        cancel_send_jobs()
         controller.disconnect()
         
         return jsonify({
@@ -386,10 +850,10 @@ def disconnect_machine():
 
 
 @app.route('/api/machines/status', methods=['GET'])
+@requires_machine_control
 def get_machine_status():
     """Get current machine status."""
     try:
-        import machine_control
         controller = machine_control.get_controller()
         status = controller.get_status()
         
@@ -413,6 +877,7 @@ def get_machine_status():
 
 
 @app.route('/api/machines/send-gcode', methods=['POST'])
+@requires_machine_control
 def send_gcode_to_machine():
     """Generate G-code from file and send directly to connected machine."""
     data = request.json
@@ -426,59 +891,141 @@ def send_gcode_to_machine():
     speed = data.get('speed', 1000)
     
     # Get file path
-    filepath = os.path.join(app.config['OUTPUT_FOLDER'], filename)
+    filepath = os.path.join(OUTPUT_FOLDER, filename)
     
     if not os.path.exists(filepath):
         return jsonify({'error': 'File not found'}), 404
     
-    try:
-        import machine_control
-        import gcode_generator
-        
-        # Check if machine is connected
-        controller = machine_control.get_controller()
-        if not controller.active_connection:
+    # Check if machine is connected
+    controller = machine_control.get_controller()
+    if not controller.active_connection:
+        return jsonify({
+            'error': 'No machine connected. Please connect first.'
+        }), 400
+    
+    # Forget results nobody collected; refuse to start a second job
+    now = time.time()
+    for job_id, (submitted, future, _, _) in list(send_jobs.items()):
+        if not future.done():
             return jsonify({
-                'error': 'No machine connected. Please connect first.'
-            }), 400
-        
-        # Generate G-code
-        gcode_path = os.path.join(
-            app.config['OUTPUT_FOLDER'],
-            os.path.splitext(filename)[0] + '.gcode'
-        )
+                'success': False,
+                'error': 'The machine is still running a job',
+                'job_id': job_id
+            }), 409
+        if now - submitted > CONVERT_JOB_TTL:
+            send_jobs.pop(job_id, None)
+    
+    gcode_path = os.path.join(
+        OUTPUT_FOLDER,
+        os.path.splitext(filename)[0] + '.gcode'
+    )
+    progress = {'percent': 0}
+    cancel = threading.Event()
+    future = machine_executor.submit(send_gcode_job, controller, filepath, gcode_path,
+                                     tuple(work_area), power, speed, progress, cancel)
+    
+    job_id = secrets.token_hex(16)
+    send_jobs[job_id] = (now, future, progress, cancel)
+    return jsonify({
+        'success': True,
+        'message': 'Sending G-code to machine',
+        'job_id': job_id
+    }), 202
+
+
+def send_gcode_job(controller, filepath, gcode_path, work_area, power, speed, progress, cancel):
+    """
+    Generate G-code for a file and stream it to the machine.
+    
+    Args:
+        controller: Connected MachineController
+        filepath: Converted file to engrave
+        gcode_path: Where to write the G-code
+        work_area: (width, height) of the work area in mm
+        power: Laser power
+        speed: Feed rate
+        progress: Dict whose 'percent' is updated while sending
+        cancel: Event set to cancel the job before it starts sending; once
+            sending, the controller's stop or disconnect ends it
         
+    Returns:
+        Tuple of (response dict, HTTP status code)
+    """
+    try:
         gcode_generator.generate_gcode_from_file(
             filepath,
             gcode_path,
-            work_area=tuple(work_area),
+            work_area=work_area,
             power=power,
             speed=speed
         )
+        if cancel.is_set():
+            return {'success': False, 'error': 'Cancelled'}, 409
         
-        # Send to machine
-        success = controller.send_gcode_file(gcode_path)
+        def on_progress(percent):
+            progress['percent'] = percent
         
-        if success:
-            return jsonify({
-                'success': True,
-                'message': 'G-code sent to machine successfully',
-                'gcode_file': os.path.basename(gcode_path)
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': 'Failed to send G-code to machine'
-            }), 500
-            
+        success = controller.send_gcode_file(gcode_path, progress_callback=on_progress)
     except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+        return {'success': False, 'error': str(e)}, 500
+    
+    if cancel.is_set():
+        return {'success': False, 'error': 'Cancelled'}, 409
+    if success:
+        return {
+            'success': True,
+            'message': 'G-code sent to machine successfully',
+            'gcode_file': os.path.basename(gcode_path)
+        }, 200
+    return {
+        'success': False,
+        'error': 'Failed to send G-code to machine'
+    }, 500
+
+
+@app.route('/api/machines/send-status/<job_id>')
+@requires_machine_control
+def send_status(job_id):
+    """Get the result of a G-code send, or {'status': 'running', 'progress'}."""
+    job = send_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    _, future, progress, _ = job
+    if not future.done():
+        return jsonify({'status': 'running', 'progress': progress['percent']})
+    
+    send_jobs.pop(job_id, None)
+    try:
+        response, status = future.result()
+    except Exception as e:
+        response, status = {'success': False, 'error': str(e)}, 500
+    return jsonify(response), status
+
+
+@app.route('/api/machines/send-cancel/<job_id>', methods=['POST'])
+@requires_machine_control
+def cancel_send(job_id):
+    """Cancel a G-code send; a job already sending stops the machine."""
+    job = send_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    if not job[1].done():
+        job[3].set()
+        machine_control.get_controller().stop()
+    return jsonify({'success': True, 'message': 'Cancelled'})
+
+
+def cancel_send_jobs():
+    """Mark unfinished G-code sends as cancelled."""
+    for _, future, _, cancel in list(send_jobs.values()):
+        if not future.done():
+            cancel.set()
 
 
 @app.route('/api/machines/control', methods=['POST'])
+@requires_machine_control
 def control_machine():
     """Control machine operations (pause, resume, stop, home)."""
     data = request.json
@@ -489,7 +1036,6 @@ def control_machine():
     action = data['action']
     
     try:
-        import machine_control
         controller = machine_control.get_controller()
         
         if not controller.active_connection:
@@ -502,10 +1048,12 @@ def control_machine():
         elif action == 'resume':
             result = controller.resume()
         elif action == 'stop':
+            cancel_send_jobs()
             result = controller.stop()
         elif action == 'home':
             result = controller.home()
         elif action == 'emergency_stop':
+            cancel_send_jobs()
             result = controller.emergency_stop()
         else:
             return jsonify({'error': f'Unknown action: {action}'}), 400
@@ -529,6 +1077,7 @@ def control_machine():
 
 
 @app.route('/api/machines/send-command', methods=['POST'])
+@requires_machine_control
 def send_command():
     """Send raw G-code command to machine."""
     data = request.json
@@ -539,7 +1088,6 @@ def send_command():
     command = data['command']
     
     try:
-        import machine_control
         controller = machine_control.get_controller()
         
         if not controller.active_connection:
@@ -560,6 +1108,9 @@ def send_command():
 
 
 if __name__ == '__main__':
+    # Multi-format conversion uses worker processes; required for frozen executables
+    multiprocessing.freeze_support()
+    
     print("="*70)
     print("Laser Engraving File Converter - Web Interface")
     print("WITH DIRECT MACHINE CONTROL")
@@ -577,7 +1128,6 @@ if __name__ == '__main__':
     
     # For production deployment, set debug=False
     # For development, you can set debug=True
-    import os
     debug_mode = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
     port = int(os.environ.get('PORT', 5000))
     